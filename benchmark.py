@@ -0,0 +1,323 @@
+# region import
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+
+# benchmarks never open the window
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+import maze
+# endregion import
+
+# every result is a dict with a unique 'name' and 'seconds', the time of one unit of work (lower is better)
+
+# region generation
+# time and peak memory of every generation algorithm across maze sizes
+def bench_generation(sizes: list[int], algorithms: list[str], seed: int) -> list[dict]:
+    results = []
+    for size in sizes:
+        for algorithm in algorithms:
+            generator = maze.MAZE_GENERATORS[algorithm]
+
+            # time and memory in separate runs, tracemalloc slows allocation down
+            start_time = time.perf_counter()
+            generator(size, size, random.Random(seed))
+            seconds = time.perf_counter() - start_time
+            tracemalloc.start()
+            generator(size, size, random.Random(seed))
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            results.append({'name': f'generation/{algorithm}/{size}', 'benchmark': 'generation', 'algorithm': algorithm, 'size': size, 'seconds': seconds, 'peak_memory': peak_memory})
+            print(f'{algorithm:>10} {size:>5}x{size:<5} {seconds:10.3f}s {peak_memory / 2 ** 20:10.2f} MiB')
+    return results
+
+# time of Maze(seed) generating and then loading the same maze from the maze cache
+def bench_cache(sizes: list[int], algorithms: list[str], seed: int) -> list[dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        maze.MAZE_CACHE_DIR = cache_dir
+        for size in sizes:
+            maze.set_maze_size(size, size)
+            for algorithm in algorithms:
+                times = []
+                for _ in range(2):
+                    start_time = time.perf_counter()
+                    maze.Maze(seed, algorithm)
+                    times.append(time.perf_counter() - start_time)
+
+                results.append({'name': f'cache/{algorithm}/{size}', 'benchmark': 'cache', 'algorithm': algorithm, 'size': size, 'seconds': times[1], 'generate_seconds': times[0]})
+                print(f'{algorithm:>10} {size:>5}x{size:<5} generate {times[0]:10.3f}s cached {times[1]:10.3f}s')
+        maze.MAZE_CACHE_DIR = None
+    maze.set_maze_size(5, 5)
+    return results
+
+# endregion generation
+
+# region step
+# raw throughput of the game loop step: choose_action, move_player, reward, update_q_value
+def bench_step(steps: int, seed: int) -> list[dict]:
+    results = []
+    for backend in ['dict', 'array']:
+        game_maze = maze.Maze(seed)
+        random.seed(seed)
+        coins = game_maze.all_coins_mask
+        player = maze.Player()
+        q_learning = (maze.ArrayQlearning if backend == 'array' else maze.Qlearning)(100)
+        move_left = maze.MOVE_PER_EPISODE
+
+        start_time = time.perf_counter()
+        for _ in range(steps):
+            player_pos_before = player.pos
+            action = q_learning.choose_action(player.pos)
+            moved = maze.move_player(game_maze, player, action)
+            move_left -= 1
+
+            reward = 0
+            if not moved:
+                reward -= 1
+            if player.rect.colliderect(game_maze.end_point):
+                reward += 100
+            coins, collected = game_maze.collect_coin(coins, player.pos)
+            if collected:
+                reward += 5
+            if player.pos == player.last_last_pos:
+                reward -= 1
+            player.last_last_pos = player.last_pos
+            player.last_pos = player.pos
+
+            q_learning.update_q_value(player_pos_before, player.pos, action, reward)
+            if move_left == 0 or player.rect.colliderect(game_maze.end_point):
+                q_learning.end_episode()
+                player = maze.reset_game(player)
+                coins = game_maze.all_coins_mask
+                move_left = maze.MOVE_PER_EPISODE
+        seconds = (time.perf_counter() - start_time) / steps
+
+        results.append({'name': f'step/{backend}', 'benchmark': 'step', 'q_table': backend, 'steps': steps, 'seconds': seconds, 'steps_per_sec': 1 / seconds})
+        print(f'step {backend:>6} {1 / seconds:12.0f} steps/sec')
+
+    # coin aware states of the environment in a sparse Q table, which only grows with the states visited
+    game_maze = maze.Maze(seed)
+    random.seed(seed)
+    env = maze.MazeEnv(game_maze, coin_state=True)
+    q_learning = maze.SparseQlearning(100)
+    state = env.reset()
+    start_time = time.perf_counter()
+    for _ in range(steps):
+        action = q_learning.choose_action(state)
+        next_state, reward, finished, done = env.step(action)
+        q_learning.update_q_value(state, next_state, action, reward)
+        state = next_state
+        if done:
+            q_learning.end_episode()
+            state = env.reset()
+    seconds = (time.perf_counter() - start_time) / steps
+
+    results.append({'name': 'step/coin_state', 'benchmark': 'step', 'q_table': 'sparse', 'steps': steps, 'seconds': seconds, 'steps_per_sec': 1 / seconds, 'states': len(q_learning.index)})
+    print(f'step {"coin_state":>6} {1 / seconds:12.0f} steps/sec, {len(q_learning.index)} states')
+    return results
+
+# endregion step
+
+# region convergence
+# episodes and time until the greedy path is as short as the maze path, fixed seed
+def bench_convergence(seed: int, max_episodes: int) -> list[dict]:
+    results = []
+    for backend in ['dict', 'array']:
+        game_maze = maze.Maze(seed)
+        random.seed(seed)
+        q_learning = (maze.ArrayQlearning if backend == 'array' else maze.Qlearning)(max_episodes)
+        converged_episode, steps, seconds = maze.train_until_solved(game_maze, q_learning, max_episodes)
+
+        results.append({'name': f'convergence/{backend}', 'benchmark': 'convergence', 'q_table': backend, 'seed': seed, 'episodes': converged_episode, 'steps': steps, 'seconds': seconds})
+        print(f'convergence {backend:>6} {converged_episode} episodes {seconds:10.3f}s')
+    return results
+
+# episodes, environment steps and time to solve of Q learning, Dyna-Q, prioritized sweeping and experience replay
+# on the same seeds of size x size mazes, unsolved seeds count as max_episodes
+def bench_planning(seeds: list[int], max_episodes: int, planning_steps: int, size: int = 5) -> list[dict]:
+    results = []
+    maze.set_maze_size(size, size)
+    learners = {
+        'qlearning': lambda: maze.Qlearning(max_episodes),
+        'dyna': lambda: maze.DynaQlearning(max_episodes, planning='dyna', planning_steps=planning_steps),
+        'prioritized': lambda: maze.DynaQlearning(max_episodes, planning='prioritized', planning_steps=planning_steps),
+        'replay': lambda: maze.ReplayQlearning(max_episodes),
+        'replay_prioritized': lambda: maze.ReplayQlearning(max_episodes, prioritized=True),
+    }
+    for name, make_learner in learners.items():
+        episodes, steps, seconds, solved = 0, 0, 0, 0
+        for seed in seeds:
+            # seed random before the learner is made, so every learner starts from the same rng state
+            game_maze = maze.Maze(seed)
+            random.seed(seed)
+            solved_episode, seed_steps, seed_seconds = maze.train_until_solved(game_maze, make_learner(), max_episodes)
+            episodes += solved_episode if solved_episode != None else max_episodes
+            steps += seed_steps
+            seconds += seed_seconds
+            solved += solved_episode != None
+
+        results.append({'name': f'planning/{name}/{size}', 'benchmark': 'planning', 'learner': name, 'size': size, 'seeds': len(seeds), 'solved': solved, 'mean_episodes': episodes / len(seeds), 'mean_steps': steps / len(seeds), 'seconds': seconds / len(seeds)})
+        print(f'{name:>18} {size:>3}x{size:<3} solved {solved}/{len(seeds)} {episodes / len(seeds):8.1f} episodes {steps / len(seeds):10.1f} steps {seconds / len(seeds):8.3f}s per seed')
+    maze.set_maze_size(5, 5)
+    return results
+
+# endregion convergence
+
+# region render
+# frame time of a full draw_window with and without q values, and of the dirty update path
+# then of the camera following the player in mazes of camera_sizes, which should not grow with the maze
+def bench_render(frames: int, seed: int, camera_sizes: list[int]) -> list[dict]:
+    results = []
+    game_maze = maze.Maze(seed)
+    coins = game_maze.all_coins_mask
+    player = maze.Player()
+    q_learning = maze.Qlearning(100)
+    maze.init_display()
+    panel = maze.Panel()
+    panel.init_panel()
+    panel.set_info_lines(maze.training_info_lines(1, maze.MOVE_PER_EPISODE, 1, None, None))
+
+    for name, display_q_values, full in [('draw_window', False, True), ('draw_window_q_values', True, True), ('update_window_q_values', True, False)]:
+        maze.draw_window(game_maze, coins, player, q_learning, panel, display_q_values)
+        start_time = time.perf_counter()
+        for frame in range(frames):
+            # change one q value per frame like a training step
+            q_learning.update_q_value((0, 0), (0, 0), frame % 4, frame % 7)
+            if full:
+                maze.draw_window(game_maze, coins, player, q_learning, panel, display_q_values)
+            else:
+                maze.update_window(game_maze, coins, player, q_learning, panel, display_q_values, maze.q_value_overlay.take_updated_grids(q_learning), [1])
+        seconds = (time.perf_counter() - start_time) / frames
+
+        results.append({'name': f'render/{name}', 'benchmark': 'render', 'frames': frames, 'seconds': seconds})
+        print(f'{name:>24} {seconds * 1000:10.3f} ms/frame')
+
+    for size in camera_sizes:
+        maze.set_maze_size(size, size)
+        game_maze = maze.Maze(seed)
+        coins = game_maze.all_coins_mask
+        player = maze.Player()
+        q_learning = maze.ArrayQlearning(100)
+        camera = maze.Camera()
+        camera.follow = True
+        start_time = time.perf_counter()
+        for frame in range(frames):
+            # move down and right so the camera scrolls
+            maze.move_player(game_maze, player, 2 if frame % 2 == 0 else 3)
+            maze.draw_view(game_maze, coins, player, q_learning, panel, True, camera)
+        seconds = (time.perf_counter() - start_time) / frames
+
+        name = f'camera_{size}x{size}'
+        results.append({'name': f'render/{name}', 'benchmark': 'render', 'frames': frames, 'size': size, 'seconds': seconds})
+        print(f'{name:>24} {seconds * 1000:10.3f} ms/frame')
+    maze.set_maze_size(5, 5)
+    return results
+
+# endregion render
+
+# region import time
+# wall time of importing maze in a fresh process (what a pool worker pays), minus the interpreter start
+def bench_import(runs: int) -> list[dict]:
+    def run(code: str) -> float:
+        start_time = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        return time.perf_counter() - start_time
+
+    # importing must not pull in pygame
+    run("import sys, maze; assert 'pygame' not in sys.modules, 'importing maze imported pygame'")
+    interpreter_seconds = min(run('pass') for _ in range(runs))
+    seconds = max(min(run('import maze') for _ in range(runs)) - interpreter_seconds, 0)
+
+    print(f'import maze {seconds * 1000:10.3f} ms')
+    return [{'name': 'import/maze', 'benchmark': 'import', 'runs': runs, 'seconds': seconds}]
+
+# endregion import time
+
+# region baseline
+# compare results to a baseline, return names slower than the baseline by more than the tolerance
+def compare_baseline(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    baseline_seconds = {result['name']: result['seconds'] for result in baseline}
+    regressions = []
+    for result in results:
+        if result['name'] not in baseline_seconds or baseline_seconds[result['name']] <= 0:
+            continue
+        ratio = result['seconds'] / baseline_seconds[result['name']]
+        regressed = ratio > 1 + tolerance
+        if regressed:
+            regressions.append(result['name'])
+        print(f'{result["name"]:>32} {ratio:8.2f}x baseline{"  REGRESSION" if regressed else ""}')
+    return regressions
+
+# endregion baseline
+
+if __name__ == '__main__':
+    common_parser = argparse.ArgumentParser(add_help=False)
+    common_parser.add_argument('--seed', type=int, default=1, help='maze seed')
+    common_parser.add_argument('--output', default=None, help='write results as json to this file')
+    common_parser.add_argument('--baseline', default=None, help='compare results to this json file, exit 1 on regression')
+    common_parser.add_argument('--save-baseline', default=None, help='write results as the new baseline to this file')
+    common_parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown against the baseline')
+
+    parser = argparse.ArgumentParser(description='Q learning maze benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+    generation_parser = subparsers.add_parser('generation', parents=[common_parser], help='maze generation time and memory')
+    step_parser = subparsers.add_parser('step', parents=[common_parser], help='training step throughput')
+    convergence_parser = subparsers.add_parser('convergence', parents=[common_parser], help='episodes and time to the shortest greedy path')
+    render_parser = subparsers.add_parser('render', parents=[common_parser], help='frame time of draw_window')
+    planning_parser = subparsers.add_parser('planning', parents=[common_parser], help='episodes to solve with and without planning or replay')
+    import_parser = subparsers.add_parser('import', parents=[common_parser], help='time to import maze in a new process')
+    all_parser = subparsers.add_parser('all', parents=[common_parser], help='run every benchmark')
+    for sub_parser in [generation_parser, all_parser]:
+        sub_parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 300], help='maze side lengths')
+        sub_parser.add_argument('--algorithms', nargs='+', choices=list(maze.MAZE_GENERATORS), default=list(maze.MAZE_GENERATORS), help='generation algorithms')
+    for sub_parser in [step_parser, all_parser]:
+        sub_parser.add_argument('--steps', type=int, default=100000, help='training steps to time')
+    for sub_parser in [convergence_parser, planning_parser, all_parser]:
+        sub_parser.add_argument('--max-episodes', type=int, default=2000, help='give up after this many episodes')
+    for sub_parser in [planning_parser, all_parser]:
+        sub_parser.add_argument('--seeds', type=int, nargs='+', default=list(range(1, 21)), help='maze seeds')
+        sub_parser.add_argument('--planning-steps', type=int, default=20, help='simulated backups per real move')
+        sub_parser.add_argument('--planning-sizes', type=int, nargs='+', default=[5], help='maze side lengths to solve')
+    for sub_parser in [render_parser, all_parser]:
+        sub_parser.add_argument('--frames', type=int, default=300, help='frames to time')
+        sub_parser.add_argument('--camera-sizes', type=int, nargs='+', default=[50, 500], help='maze side lengths rendered through the camera')
+    for sub_parser in [import_parser, all_parser]:
+        sub_parser.add_argument('--runs', type=int, default=10, help='imports to time, the fastest counts')
+    args = parser.parse_args()
+
+    results = []
+    if args.benchmark in ['generation', 'all']:
+        results += bench_generation(args.sizes, args.algorithms, args.seed)
+        results += bench_cache(args.sizes, args.algorithms, args.seed)
+    if args.benchmark in ['step', 'all']:
+        results += bench_step(args.steps, args.seed)
+    if args.benchmark in ['convergence', 'all']:
+        results += bench_convergence(args.seed, args.max_episodes)
+    if args.benchmark in ['planning', 'all']:
+        for size in args.planning_sizes:
+            results += bench_planning(args.seeds, args.max_episodes, args.planning_steps, size)
+    if args.benchmark in ['render', 'all']:
+        results += bench_render(args.frames, args.seed, args.camera_sizes)
+    if args.benchmark in ['import', 'all']:
+        results += bench_import(args.runs)
+
+    report = {'python': platform.python_version(), 'machine': platform.machine(), 'results': results}
+    for path in [args.output, args.save_baseline]:
+        if path != None:
+            with open(path, 'w') as file:
+                json.dump(report, file, indent=2)
+    if args.baseline != None:
+        with open(args.baseline) as file:
+            regressions = compare_baseline(results, json.load(file)['results'], args.tolerance)
+        if len(regressions) > 0:
+            print(f'{len(regressions)} regressions: {", ".join(regressions)}')
+            sys.exit(1)
@@ -1,18 +1,24 @@
 # region import
-import pygame
+from __future__ import annotations
+import os
+import json
+import time
+import queue
+import heapq
+import math
+import array
+import argparse
 import random
+import multiprocessing
+import numpy as np
+# pygame is imported on first use by load_pygame, so training code imports without it
+pygame = None
 # endregion import
 
-# region pygame init
-pygame.init()
-pygame.mixer.init()
-# endregion pygame init
-
 # region CONSTANT
 # window settings
 WIN_WIDTH, WIN_HEIGHT = 1000, 600
-WIN = pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT))
-pygame.display.set_caption("Maze")
+WIN = None
 
 # FPS constant
 FPS = 60
@@ -34,31 +40,110 @@ MAZE_SIZE = (5, 5)
 WALL_WIDTH = 10
 GRID_WIDTH, GRID_HEIGHT = (GAME_WIN_WIDTH - ((MAZE_SIZE[1] + 1) * WALL_WIDTH)) / MAZE_SIZE[1], (GAME_WIN_HEIGHT - ((MAZE_SIZE[0] + 1) * WALL_WIDTH)) / MAZE_SIZE[0]
 PLAYER_WIDTH, PLAYER_HEIGHT = GRID_WIDTH * 0.45, GRID_HEIGHT * 0.45
+# size of the maze layout in pixels, larger than the game area when grids would be smaller than CAMERA_MIN_GRID_SIZE
+WORLD_WIDTH, WORLD_HEIGHT = GAME_WIN_WIDTH, GAME_WIN_HEIGHT
 PRESS_COOLDOWN = 0.5
 
 # tring constans
 MOVE_PER_EPISODE = MAZE_SIZE[0] * MAZE_SIZE[1]
+# action:0->up, 1->left, 2->down, 3->right
+ACTION_MOVES = [(-1, 0), (0, -1), (1, 0), (0, 1)]
+# rows a SparseQlearning table starts with, doubled whenever it fills up
+SPARSE_Q_TABLE_ROWS = 1024
 
 # text constant
 FONT = "Verdana"
 FONT_SIZE = 30
+Q_VALUE_TEXT_CACHE_SIZE = 4096
+PROFILE_FONT_SIZE = 18
+PROFILE_READOUT_INTERVAL = 0.5
+PROFILE_TRACE_BUFFER_SIZE = 30000
+
+# frame export constants
+# frames waiting for the writer process, rendering blocks when it is this far ahead
+EXPORT_QUEUE_SIZE = 32
+# seconds to wait on a full frame queue before checking the writers are still alive
+EXPORT_PUT_TIMEOUT = 1
+EXPORT_FPS = 30
+# processes encoding a PNG sequence, one core is left to rendering
+EXPORT_PNG_WRITERS = max((os.cpu_count() or 1) - 1, 1)
+
+# background training constants
+# steps per second of the speed buttons 1 to 5, None trains as fast as possible
+BACKGROUND_SPEEDS = [60, 600, 6000, 60000, None]
+BACKGROUND_PUBLISH_INTERVAL = 1 / 120
+
+# camera constants
+CAMERA_MIN_GRID_SIZE = 40
+CAMERA_MAX_VISIBLE_CELLS = 60
+CAMERA_MAX_SCALE = 4
+CAMERA_ZOOM_STEP = 1.25
+CAMERA_MIN_Q_VALUE_FONT_SIZE = 8
 
-# image
-coin_image = pygame.transform.scale(pygame.image.load('coin.png'), (GRID_WIDTH * 0.4, GRID_HEIGHT * 0.4))
-wall_image = pygame.image.load('wall.png')
-start_point_image = pygame.transform.scale(pygame.image.load('start_point.png'), (GRID_WIDTH * 0.7, GRID_HEIGHT * 0.7))
-end_point_image = pygame.transform.scale(pygame.image.load('end_point.png'), (GRID_WIDTH * 0.7, GRID_HEIGHT * 0.7))
-player_up = pygame.transform.scale(pygame.image.load('player_up.png'), (PLAYER_WIDTH, PLAYER_HEIGHT))
-player_down = pygame.transform.scale(pygame.image.load('player_down.png'), (PLAYER_WIDTH, PLAYER_HEIGHT))
-player_left = pygame.transform.scale(pygame.image.load('player_left.png'), (PLAYER_WIDTH, PLAYER_HEIGHT))
-player_right = pygame.transform.scale(pygame.image.load('player_right.png'), (PLAYER_WIDTH, PLAYER_HEIGHT))
+# generated mazes are cached here by (algorithm, size, seed), read from the environment so worker processes share it
+# None turns the cache off
+MAZE_CACHE_DIR = os.environ.get('MAZE_CACHE_DIR')
 
-# sfx
-button_click_sfx = pygame.mixer.Sound("button_click_sfx.mp3")
-finish_sfx = pygame.mixer.Sound("finish_sfx.mp3")
+# images and sfx, loaded by init_display
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+coin_image = wall_image = start_point_image = end_point_image = None
+player_up = player_down = player_left = player_right = None
+button_click_sfx = finish_sfx = None
+
+# change the maze size, call before the window opens
+# grids fill the game area as before, down to CAMERA_MIN_GRID_SIZE, larger mazes are viewed through a Camera
+def set_maze_size(rows: int, cols: int):
+    global MAZE_SIZE, GRID_WIDTH, GRID_HEIGHT, PLAYER_WIDTH, PLAYER_HEIGHT, WORLD_WIDTH, WORLD_HEIGHT, MOVE_PER_EPISODE
+    MAZE_SIZE = (rows, cols)
+    GRID_WIDTH = max((GAME_WIN_WIDTH - ((cols + 1) * WALL_WIDTH)) / cols, CAMERA_MIN_GRID_SIZE)
+    GRID_HEIGHT = max((GAME_WIN_HEIGHT - ((rows + 1) * WALL_WIDTH)) / rows, CAMERA_MIN_GRID_SIZE)
+    PLAYER_WIDTH, PLAYER_HEIGHT = GRID_WIDTH * 0.45, GRID_HEIGHT * 0.45
+    WORLD_WIDTH, WORLD_HEIGHT = cols * (GRID_WIDTH + WALL_WIDTH) + WALL_WIDTH, rows * (GRID_HEIGHT + WALL_WIDTH) + WALL_WIDTH
+    MOVE_PER_EPISODE = rows * cols
 
 # endregion CONSTANT
 
+# region pygame init
+# import pygame without initializing anything, enough for rects
+def load_pygame():
+    global pygame
+    if pygame == None:
+        import pygame
+
+# init pygame, open the window and load assets, only done by rendering entry points
+# offscreen uses the SDL dummy drivers (unless SDL_VIDEODRIVER / SDL_AUDIODRIVER name others),
+# the window is then a surface in memory and needs no display or sound card
+def init_display(offscreen: bool = False):
+    global WIN, coin_image, wall_image, start_point_image, end_point_image, player_up, player_down, player_left, player_right, button_click_sfx, finish_sfx
+    if WIN != None:
+        return
+    if offscreen:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    load_pygame()
+    pygame.init()
+    pygame.mixer.init()
+
+    # window settings
+    WIN = pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT))
+    pygame.display.set_caption("Maze")
+
+    # image
+    coin_image = pygame.transform.scale(pygame.image.load(os.path.join(ASSET_DIR, 'coin.png')), (GRID_WIDTH * 0.4, GRID_HEIGHT * 0.4))
+    wall_image = pygame.image.load(os.path.join(ASSET_DIR, 'wall.png'))
+    start_point_image = pygame.transform.scale(pygame.image.load(os.path.join(ASSET_DIR, 'start_point.png')), (GRID_WIDTH * 0.7, GRID_HEIGHT * 0.7))
+    end_point_image = pygame.transform.scale(pygame.image.load(os.path.join(ASSET_DIR, 'end_point.png')), (GRID_WIDTH * 0.7, GRID_HEIGHT * 0.7))
+    player_up = pygame.transform.scale(pygame.image.load(os.path.join(ASSET_DIR, 'player_up.png')), (PLAYER_WIDTH, PLAYER_HEIGHT))
+    player_down = pygame.transform.scale(pygame.image.load(os.path.join(ASSET_DIR, 'player_down.png')), (PLAYER_WIDTH, PLAYER_HEIGHT))
+    player_left = pygame.transform.scale(pygame.image.load(os.path.join(ASSET_DIR, 'player_left.png')), (PLAYER_WIDTH, PLAYER_HEIGHT))
+    player_right = pygame.transform.scale(pygame.image.load(os.path.join(ASSET_DIR, 'player_right.png')), (PLAYER_WIDTH, PLAYER_HEIGHT))
+
+    # sfx
+    button_click_sfx = pygame.mixer.Sound(os.path.join(ASSET_DIR, 'button_click_sfx.mp3'))
+    finish_sfx = pygame.mixer.Sound(os.path.join(ASSET_DIR, 'finish_sfx.mp3'))
+
+# endregion pygame init
+
 # region Qlearning
 class Qlearning():
     # state:player pos:(row, col) action:0->up, 1->left, 2->down, 3->right
@@ -69,6 +154,13 @@ class Qlearning():
         self.epsilon_decay = epsilon_decay
         self.learing_rate = learning_rate
         self.discount_factor = discount_factor
+        # states updated since the overlay or convergence tracker last read them,
+        # only collected once one of them turned track_updates on, headless runs skip it
+        self.track_updates = False
+        self.updated_states = set()
+        self.init_q_table()
+
+    def init_q_table(self):
         self.q_table = dict()
         for row in range(MAZE_SIZE[0]):
             for col in range(MAZE_SIZE[1]):
@@ -82,83 +174,612 @@ class Qlearning():
             actions_q_value = self.q_table[state]
             return actions_q_value.index(max(actions_q_value))
     
-    def update_q_value(self, state: tuple[int, int], state_plus1: tuple[int, int], action: int, reward: int):
+    # model_reward is reward without the coin bonus (see MazeEnv.step), a coin pays once per episode,
+    # only learners that remember moves to replay them later use it
+    def update_q_value(self, state: tuple[int, int], state_plus1: tuple[int, int], action: int, reward: int, model_reward: float = None):
         if random.random() < self.epsilon:
             future_reward = self.q_table[state_plus1][random.randint(0, 3)]
         else:
             actions_q_value = self.q_table[state_plus1]
             future_reward = max(actions_q_value)
         self.q_table[state][action] = self.q_table[state][action] + self.learing_rate * (reward + self.discount_factor * future_reward - self.q_table[state][action])
+        if self.track_updates:
+            self.updated_states.add(state)
     
     def end_episode(self):
         self.epsilon *= self.epsilon_decay
         self.current_episode += 1
 
+# Q table backed by a contiguous (rows, cols, 4) float32 array
+# state can be (row, col) or the integer index row * cols + col
+class ArrayQlearning(Qlearning):
+    def init_q_table(self):
+        self.q_table = np.zeros((MAZE_SIZE[0], MAZE_SIZE[1], 4), dtype=np.float32)
+        # (rows * cols, 4) view of the same memory for integer states
+        self.flat_q_table = self.q_table.reshape(-1, 4)
+
+    def actions_q_value(self, state) -> np.ndarray:
+        return self.q_table[state] if isinstance(state, tuple) else self.flat_q_table[state]
+
+    # flat index row * cols + col of a state
+    def flat_state(self, state) -> int:
+        return state[0] * MAZE_SIZE[1] + state[1] if isinstance(state, tuple) else state
+
+    def choose_action(self, state) -> int:
+        if random.random() < self.epsilon:
+            return random.randint(0, 3)
+        else:
+            return int(self.actions_q_value(state).argmax())
+
+    def update_q_value(self, state, state_plus1, action: int, reward: int, model_reward: float = None):
+        if random.random() < self.epsilon:
+            future_reward = self.actions_q_value(state_plus1)[random.randint(0, 3)]
+        else:
+            future_reward = self.actions_q_value(state_plus1).max()
+        actions_q_value = self.actions_q_value(state)
+        actions_q_value[action] += self.learing_rate * (reward + self.discount_factor * future_reward - actions_q_value[action])
+        if self.track_updates:
+            self.updated_states.add(state if isinstance(state, tuple) else divmod(state, MAZE_SIZE[1]))
+
+    # greedy action of every state, shape (rows, cols)
+    def greedy_policy(self) -> np.ndarray:
+        return self.q_table.argmax(axis=2)
+
+    # max q value of every state, shape (rows, cols)
+    def state_values(self) -> np.ndarray:
+        return self.q_table.max(axis=2)
+
+    # copy of the whole table
+    def snapshot(self) -> np.ndarray:
+        return self.q_table.copy()
+
+# fixed capacity ring buffer of transitions in preallocated arrays, states are flat grid indexes
+# sampling is uniform, or proportional to priority ** alpha with importance weights when prioritized
+# priorities ** alpha are kept in a two level sum tree: blocks of about sqrt(capacity) leaves and the sum of
+# every block, adding or updating a priority resums its block and drawing a transition walks the block sums
+# then one block, about 2 * sqrt(capacity) values in a few vectorized calls instead of a pass over the buffer
+class ReplayBuffer():
+    def __init__(self, capacity: int, prioritized: bool = False, alpha: float = 0.6, beta: float = 0.4):
+        self.capacity = capacity
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.beta = beta
+        self.states = np.zeros(capacity, dtype=np.int32)
+        self.actions = np.zeros(capacity, dtype=np.int8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros(capacity, dtype=np.int32)
+        self.block_size = math.isqrt(capacity - 1) + 1
+        blocks = -(-capacity // self.block_size) if prioritized else 0
+        self.leaves = np.zeros((blocks, self.block_size))
+        self.block_sums = np.zeros(blocks)
+        # largest priority so far, new transitions get it so they are replayed at least once soon
+        self.max_priority = 1.0
+        self.size = 0
+        self.next_index = 0
+        # seeded from random, so seeding the agent also seeds the sampling
+        self.rng = np.random.default_rng(random.getrandbits(32))
+
+    def add(self, state: int, action: int, reward: float, next_state: int):
+        idx = self.next_index
+        self.states[idx] = state
+        self.actions[idx] = action
+        self.rewards[idx] = reward
+        self.next_states[idx] = next_state
+        if self.prioritized:
+            block, leaf = divmod(idx, self.block_size)
+            self.leaves[block, leaf] = self.max_priority ** self.alpha
+            self.block_sums[block] = self.leaves[block].sum()
+        self.next_index = (idx + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    # indexes and importance weights of a minibatch
+    def sample(self, batch_size: int) -> tuple[np.ndarray, np.ndarray]:
+        if not self.prioritized:
+            return self.rng.integers(0, self.size, batch_size), np.ones(batch_size, dtype=np.float32)
+        # one target in each of batch_size equal slices of the total, found in the block sums then in its block
+        block_ends = np.cumsum(self.block_sums)
+        total = block_ends[-1]
+        targets = (np.arange(batch_size) + self.rng.random(batch_size)) * (total / batch_size)
+        blocks = np.minimum(np.searchsorted(block_ends, targets, side='right'), len(block_ends) - 1)
+        targets -= block_ends[blocks] - self.block_sums[blocks]
+        leaves = np.minimum((np.cumsum(self.leaves[blocks], axis=1) <= targets[:, None]).sum(axis=1), self.block_size - 1)
+        # rounding in the sums can step past the last transition
+        indexes = np.minimum(blocks * self.block_size + leaves, self.size - 1)
+        weights = (self.size * self.leaves.ravel()[indexes] / total) ** -self.beta
+        return indexes, (weights / weights.max()).astype(np.float32)
+
+    def update_priorities(self, indexes: np.ndarray, errors: np.ndarray):
+        priorities = np.abs(errors) + 1e-3
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.leaves.ravel()[indexes] = priorities ** self.alpha
+        blocks = indexes // self.block_size
+        self.block_sums[blocks] = self.leaves[blocks].sum(axis=1)
+
+    def nbytes(self) -> int:
+        return self.states.nbytes + self.actions.nbytes + self.rewards.nbytes + self.next_states.nbytes + self.leaves.nbytes + self.block_sums.nbytes
+
+# array Q learning that also replays a minibatch from a replay buffer after every real move
+# the buffer keeps model_reward, a coin is gone once collected and replaying its bonus would keep luring the agent back
+class ReplayQlearning(ArrayQlearning):
+    def __init__(self, episodes: int, epsilon_decay: float = 0.99, learning_rate: float = 0.1, discount_factor: float = 0.8, capacity: int = 10000, batch_size: int = 32, prioritized: bool = False):
+        super().__init__(episodes, epsilon_decay, learning_rate, discount_factor)
+        self.replay_buffer = ReplayBuffer(capacity, prioritized)
+        self.batch_size = batch_size
+
+    def update_q_value(self, state, state_plus1, action: int, reward: int, model_reward: float = None):
+        super().update_q_value(state, state_plus1, action, reward)
+        self.replay_buffer.add(self.flat_state(state), action, model_reward if model_reward != None else reward, self.flat_state(state_plus1))
+        self.replay()
+
+    # one vectorized update from a sampled minibatch
+    def replay(self):
+        buffer = self.replay_buffer
+        indexes, weights = buffer.sample(self.batch_size)
+        states = buffer.states[indexes]
+        # Q values flat as state * 4 + action
+        keys = states * 4 + buffer.actions[indexes]
+        q_values = self.q_table.reshape(-1)
+        current_q_values = q_values[keys]
+        errors = buffer.rewards[indexes] + self.discount_factor * self.flat_q_table[buffer.next_states[indexes]].max(axis=1) - current_q_values
+        # a (state, action) drawn more than once is updated once, with the error of one of its draws,
+        # adding them all up against the same old Q value overshoots the target, by up to batch_size
+        # times while the buffer holds fewer moves than a batch
+        q_values[keys] = current_q_values + self.learing_rate * weights * errors
+        if buffer.prioritized:
+            buffer.update_priorities(indexes, errors)
+        if self.track_updates:
+            for state in np.unique(states).tolist():
+                self.updated_states.add(divmod(state, MAZE_SIZE[1]))
+
+# Q table that only allocates the states it visits, for integer state keys of a space too large for an array,
+# like the coin aware states of MazeEnv. a dict maps each key to its row of a (rows, 4) float32 array
+# a key modulo rows * cols is its flat grid, that is what updated_states holds
+class SparseQlearning(Qlearning):
+    def init_q_table(self):
+        self.index = dict()
+        self.q_values = np.zeros((SPARSE_Q_TABLE_ROWS, 4), dtype=np.float32)
+
+    # Q values of a state, a zero row is allocated on its first visit
+    def actions_q_value(self, state: int) -> np.ndarray:
+        row = self.index.get(state)
+        if row == None:
+            row = self.index[state] = len(self.index)
+            if row == len(self.q_values):
+                self.q_values = np.concatenate([self.q_values, np.zeros_like(self.q_values)])
+        return self.q_values[row]
+
+    def choose_action(self, state: int) -> int:
+        if random.random() < self.epsilon:
+            return random.randint(0, 3)
+        else:
+            return int(self.actions_q_value(state).argmax())
+
+    def update_q_value(self, state: int, state_plus1: int, action: int, reward: int, model_reward: float = None):
+        if random.random() < self.epsilon:
+            future_reward = self.actions_q_value(state_plus1)[random.randint(0, 3)]
+        else:
+            future_reward = self.actions_q_value(state_plus1).max()
+        # after state_plus1, which may grow the array
+        actions_q_value = self.actions_q_value(state)
+        actions_q_value[action] += self.learing_rate * (reward + self.discount_factor * future_reward - actions_q_value[action])
+        if self.track_updates:
+            self.updated_states.add(divmod(state % (MAZE_SIZE[0] * MAZE_SIZE[1]), MAZE_SIZE[1]))
+
+    # bytes of the Q values allocated so far
+    def nbytes(self) -> int:
+        return self.q_values.nbytes
+
+# Q learning plus planning on a model learned from real moves, the maze is deterministic so the
+# model keeps the next state of every (state, action) and the mean of its model_reward, coins pay
+# only once per episode and are left out, the backtrack penalty depends on the move before, which
+# a (row, col) state does not see, so the model keeps how often the move was a backtrack
+# planning 'dyna': Dyna-Q, k backups of random remembered (state, action) after every real move
+# planning 'prioritized': prioritized sweeping, after every real move k backups of the queued
+# (state, action) with the largest bellman error, each backup queues the predecessors of its state
+class DynaQlearning(Qlearning):
+    def __init__(self, episodes: int, epsilon_decay: float = 0.99, learning_rate: float = 0.1, discount_factor: float = 0.8, planning: str = 'dyna', planning_steps: int = 10, priority_threshold: float = 1e-4):
+        super().__init__(episodes, epsilon_decay, learning_rate, discount_factor)
+        self.planning = planning
+        self.planning_steps = planning_steps
+        self.priority_threshold = priority_threshold
+        self.model = dict()
+        self.model_keys = []
+        self.predecessors = dict()
+        self.queue = []
+        # priority of the newest queue entry of every queued (state, action), older entries are skipped when popped
+        self.queued = dict()
+
+    def update_q_value(self, state: tuple[int, int], state_plus1: tuple[int, int], action: int, reward: int, model_reward: float = None):
+        super().update_q_value(state, state_plus1, action, reward)
+        # learn the model
+        model_reward = model_reward if model_reward != None else reward
+        if (state, action) not in self.model:
+            self.model_keys.append((state, action))
+            self.model[(state, action)] = (model_reward, state_plus1, 1)
+        else:
+            mean_reward, _, visits = self.model[(state, action)]
+            self.model[(state, action)] = (mean_reward + (model_reward - mean_reward) / (visits + 1), state_plus1, visits + 1)
+        self.predecessors.setdefault(state_plus1, set()).add((state, action))
+
+        if self.planning == 'prioritized':
+            if self.planning_steps == 0:
+                return
+            self.push((state, action), abs(self.error(state, action)))
+            self.push_predecessors(state)
+            backups = 0
+            while backups < self.planning_steps and len(self.queue) > 0:
+                priority, key = heapq.heappop(self.queue)
+                if self.queued.get(key) != -priority:
+                    continue
+                del self.queued[key]
+                self.backup(*key)
+                self.push_predecessors(key[0])
+                backups += 1
+            # rebuild the queue from the live entries once the stale ones outnumber them
+            if len(self.queue) > 2 * len(self.queued) + 64:
+                self.queue = [(-priority, key) for key, priority in self.queued.items()]
+                heapq.heapify(self.queue)
+        else:
+            for _ in range(self.planning_steps):
+                self.backup(*random.choice(self.model_keys))
+
+    # bellman error of a remembered (state, action)
+    def error(self, state: tuple[int, int], action: int) -> float:
+        reward, state_plus1, _ = self.model[(state, action)]
+        return reward + self.discount_factor * max(self.q_table[state_plus1]) - self.q_table[state][action]
+
+    # one simulated update from the model
+    def backup(self, state: tuple[int, int], action: int):
+        self.q_table[state][action] += self.learing_rate * self.error(state, action)
+        if self.track_updates:
+            self.updated_states.add(state)
+
+    # queue a (state, action) key if its priority is large enough and above the priority it is queued with
+    def push(self, key: tuple[tuple[int, int], int], priority: float):
+        if priority > self.priority_threshold and priority > self.queued.get(key, 0):
+            self.queued[key] = priority
+            heapq.heappush(self.queue, (-priority, key))
+
+    # queue the remembered moves into a state whose Q values changed, their errors share its discounted max
+    # same checks as push, inlined since this runs for every predecessor of every backup
+    def push_predecessors(self, state: tuple[int, int]):
+        state_value = self.discount_factor * max(self.q_table[state])
+        model, q_table, queued = self.model, self.q_table, self.queued
+        for key in self.predecessors.get(state, ()):
+            priority = abs(model[key][0] + state_value - q_table[key[0]][key[1]])
+            if priority > self.priority_threshold and priority > queued.get(key, 0):
+                queued[key] = priority
+                heapq.heappush(self.queue, (-priority, key))
+
 # endregion Qlearning
 
+# region maze generation
+# every generator carves a rows x cols perfect maze and returns (vertical_walls, horizontal_walls),
+# bool arrays of shape (rows, cols), vertical_walls[row, col] is the wall left of the grid and
+# horizontal_walls[row, col] the wall above it, grids are flat indexed as row * cols + col
+
+# walls stored in bytearrays while carving, one byte per wall, not bit packed: a bit set per wall in pure python
+# costs a shift and mask on every carve, and the two bool arrays are 2 MB at 1000x1000 next to 16 MB of
+# transitions, the maze cache is where they are stored packed. work lists of the generators are array('i')
+def walls_to_arrays(rows: int, cols: int, vertical: bytearray, horizontal: bytearray) -> tuple[np.ndarray, np.ndarray]:
+    return np.frombuffer(vertical, dtype=bool).reshape(rows, cols), np.frombuffer(horizontal, dtype=bool).reshape(rows, cols)
+
+# remove the wall between two neighbor grids
+def remove_wall(cols: int, vertical: bytearray, horizontal: bytearray, grid: int, next_grid: int):
+    if next_grid == grid - cols:
+        horizontal[grid] = 0
+    elif next_grid == grid + cols:
+        horizontal[next_grid] = 0
+    elif next_grid == grid - 1:
+        vertical[grid] = 0
+    else:
+        vertical[next_grid] = 0
+
+# randomized DFS (recursive backtracker), long winding corridors
+def generate_dfs(rows: int, cols: int, rng: random.Random) -> tuple[np.ndarray, np.ndarray]:
+    vertical, horizontal = bytearray(b'\x01') * (rows * cols), bytearray(b'\x01') * (rows * cols)
+    visited = bytearray(rows * cols)
+    visited[0] = 1
+    stack = [0]
+
+    while len(stack) > 0:
+        # get unvisited neighbors, same order as get_neighbor_girds
+        grid = stack.pop()
+        row, col = divmod(grid, cols)
+        unvisited_neighbors = []
+        if col < cols - 1 and not visited[grid + 1]:
+            unvisited_neighbors.append(grid + 1)
+        if col > 0 and not visited[grid - 1]:
+            unvisited_neighbors.append(grid - 1)
+        if row > 0 and not visited[grid - cols]:
+            unvisited_neighbors.append(grid - cols)
+        if row < rows - 1 and not visited[grid + cols]:
+            unvisited_neighbors.append(grid + cols)
+
+        # remove wall randomly if have unvisited neighbors
+        if len(unvisited_neighbors) > 0:
+            stack.append(grid)
+            next_grid = rng.choice(unvisited_neighbors)
+            remove_wall(cols, vertical, horizontal, grid, next_grid)
+            visited[next_grid] = 1
+            stack.append(next_grid)
+
+    return walls_to_arrays(rows, cols, vertical, horizontal)
+
+# randomized Kruskal with union find, many short dead ends
+def generate_kruskal(rows: int, cols: int, rng: random.Random) -> tuple[np.ndarray, np.ndarray]:
+    vertical, horizontal = bytearray(b'\x01') * (rows * cols), bytearray(b'\x01') * (rows * cols)
+    parents = array.array('i', range(rows * cols))
+
+    # edge = grid * 2 + 0 -> right neighbor, grid * 2 + 1 -> down neighbor
+    edges = array.array('i', (grid * 2 for grid in range(rows * cols) if grid % cols < cols - 1))
+    edges.extend(range(1, (rows * cols - cols) * 2, 2))
+    rng.shuffle(edges)
+
+    for edge in edges:
+        grid = edge >> 1
+        next_grid = grid + 1 if edge & 1 == 0 else grid + cols
+        # find roots with path halving
+        a = grid
+        while parents[a] != a:
+            parents[a] = parents[parents[a]]
+            a = parents[a]
+        b = next_grid
+        while parents[b] != b:
+            parents[b] = parents[parents[b]]
+            b = parents[b]
+        if a != b:
+            parents[b] = a
+            remove_wall(cols, vertical, horizontal, grid, next_grid)
+
+    return walls_to_arrays(rows, cols, vertical, horizontal)
+
+# Wilson's loop erased random walks, uniform over all perfect mazes
+def generate_wilson(rows: int, cols: int, rng: random.Random) -> tuple[np.ndarray, np.ndarray]:
+    vertical, horizontal = bytearray(b'\x01') * (rows * cols), bytearray(b'\x01') * (rows * cols)
+    in_maze = bytearray(rows * cols)
+    in_maze[0] = 1
+    walk_next = array.array('i', [0]) * (rows * cols)
+
+    for start in range(rows * cols):
+        if in_maze[start]:
+            continue
+        # random walk until hitting the maze, overwriting exits erases loops
+        grid = start
+        while not in_maze[grid]:
+            row, col = divmod(grid, cols)
+            while True:
+                direction = rng.randrange(4)
+                if direction == 0 and row > 0:
+                    next_grid = grid - cols
+                elif direction == 1 and col > 0:
+                    next_grid = grid - 1
+                elif direction == 2 and row < rows - 1:
+                    next_grid = grid + cols
+                elif direction == 3 and col < cols - 1:
+                    next_grid = grid + 1
+                else:
+                    continue
+                break
+            walk_next[grid] = next_grid
+            grid = next_grid
+
+        # carve the loop erased walk into the maze
+        grid = start
+        while not in_maze[grid]:
+            in_maze[grid] = 1
+            remove_wall(cols, vertical, horizontal, grid, walk_next[grid])
+            grid = walk_next[grid]
+
+    return walls_to_arrays(rows, cols, vertical, horizontal)
+
+# recursive division, long straight walls with one gap each
+def generate_division(rows: int, cols: int, rng: random.Random) -> tuple[np.ndarray, np.ndarray]:
+    vertical_walls, horizontal_walls = np.zeros((rows, cols), dtype=bool), np.zeros((rows, cols), dtype=bool)
+    vertical_walls[:, 0] = True
+    horizontal_walls[0, :] = True
+
+    # chambers as (row, col, height, width), split until one grid thick
+    chambers = [(0, 0, rows, cols)]
+    while len(chambers) > 0:
+        row, col, height, width = chambers.pop()
+        if height < 2 or width < 2:
+            continue
+        if height > width or (height == width and rng.random() < 0.5):
+            cut = rng.randrange(row + 1, row + height)
+            horizontal_walls[cut, col:col + width] = True
+            horizontal_walls[cut, rng.randrange(col, col + width)] = False
+            chambers.append((row, col, cut - row, width))
+            chambers.append((cut, col, row + height - cut, width))
+        else:
+            cut = rng.randrange(col + 1, col + width)
+            vertical_walls[row:row + height, cut] = True
+            vertical_walls[rng.randrange(row, row + height), cut] = False
+            chambers.append((row, col, height, cut - col))
+            chambers.append((row, cut, height, col + width - cut))
+
+    return vertical_walls, horizontal_walls
+
+MAZE_GENERATORS = {
+    'dfs': generate_dfs,
+    'kruskal': generate_kruskal,
+    'wilson': generate_wilson,
+    'division': generate_division,
+}
+
+# endregion maze generation
+
 # region maze game
 # maze class
 class Maze():
-    def __init__(self):
-        self.generate_maze(random.randint(1, 65535))
-        self.all_coins = []
-        for i, grid in enumerate(self.path):
-            if i % 4 == 3:
-                self.all_coins.append(pygame.Rect((WALL_WIDTH + GRID_WIDTH) * grid[1] + WALL_WIDTH + GRID_WIDTH * 0.3, (WALL_WIDTH + GRID_HEIGHT) * grid[0] + WALL_WIDTH + GRID_HEIGHT * 0.3, GRID_WIDTH * 0.4, GRID_HEIGHT * 0.4))
-        self.start_point = pygame.Rect(WALL_WIDTH, WALL_WIDTH, GRID_WIDTH, GRID_HEIGHT)
-        self.end_point = pygame.Rect(GAME_WIN_WIDTH - WALL_WIDTH - GRID_WIDTH, GAME_WIN_HEIGHT - WALL_WIDTH - GRID_HEIGHT, GRID_WIDTH, GRID_HEIGHT)
-
-    # generate maze with a seed
-    def generate_maze(self, seed: int):
-        # set seed
-        print(f'seed = {seed}')
-        random.seed(seed)
-        
-        # init variables
-        self.vertical_walls, self.horizontal_walls = [[True for j in range(MAZE_SIZE[1])] for i in range(MAZE_SIZE[0])], [[True for j in range(MAZE_SIZE[1])] for i in range(MAZE_SIZE[0])]
-        start_grid = (0, 0)
-        visited = [start_grid]
-        stack = [start_grid]
-
-        # DFS
-        while len(stack) > 0:
-            # get unvisited neighbors
-            grid = stack.pop()
-            moves = get_neighbor_girds(grid)
-            unvisited_neighbors = []
-            for move in moves:
-                if (grid[0] + move[0], grid[1] + move[1]) not in visited:
-                    unvisited_neighbors.append(move)
-            
-            # remove wall randomly if have unvisited neighbors
-            if len(unvisited_neighbors) > 0:
-                stack.append(grid)
-                next = random.choice(unvisited_neighbors)
-                if next == (0, -1):
-                    self.vertical_walls[grid[0]][grid[1]] = False
-                    next = (grid[0], grid[1] - 1)
-                elif next == (0, 1):
-                    self.vertical_walls[grid[0]][grid[1]+1] = False
-                    next = (grid[0], grid[1] + 1)
-                elif next == (-1, 0):
-                    self.horizontal_walls[grid[0]][grid[1]] = False
-                    next = (grid[0] - 1, grid[1])
-                elif next == (1, 0):
-                    self.horizontal_walls[grid[0] + 1][grid[1]] = False
-                    next = (grid[0] + 1, grid[1])
-                visited.append(next)
-                stack.append(next)
-                if next == (MAZE_SIZE[0] - 1, MAZE_SIZE[1] - 1):
-                    self.path = stack.copy()
+    def __init__(self, seed: int = None, algorithm: str = 'dfs'):
+        # a fresh rng picks the seed, so the global random is left alone
+        self.seed = seed if seed != None else random.Random().randint(1, 65535)
+        self.generate_maze(self.seed, algorithm)
+        self.rects = None
+
+    # pygame rects of coins, start and end point, built on first use so training never needs pygame
+    def build_rects(self):
+        if self.rects != None:
+            return
+        load_pygame()
+        all_coins = []
+        for grid in self.coin_grids:
+            all_coins.append(pygame.Rect((WALL_WIDTH + GRID_WIDTH) * grid[1] + WALL_WIDTH + GRID_WIDTH * 0.3, (WALL_WIDTH + GRID_HEIGHT) * grid[0] + WALL_WIDTH + GRID_HEIGHT * 0.3, GRID_WIDTH * 0.4, GRID_HEIGHT * 0.4))
+        start_point = pygame.Rect(WALL_WIDTH, WALL_WIDTH, GRID_WIDTH, GRID_HEIGHT)
+        end_point = pygame.Rect(WORLD_WIDTH - WALL_WIDTH - GRID_WIDTH, WORLD_HEIGHT - WALL_WIDTH - GRID_HEIGHT, GRID_WIDTH, GRID_HEIGHT)
+        self.rects = (all_coins, start_point, end_point)
+
+    @property
+    def all_coins(self) -> list[pygame.Rect]:
+        self.build_rects()
+        return self.rects[0]
+
+    @property
+    def start_point(self) -> pygame.Rect:
+        self.build_rects()
+        return self.rects[1]
+
+    @property
+    def end_point(self) -> pygame.Rect:
+        self.build_rects()
+        return self.rects[2]
+
+    # generate maze with a seed, or load it from MAZE_CACHE_DIR
+    def generate_maze(self, seed: int, algorithm: str = 'dfs'):
+        self.algorithm = algorithm
+        self.surface = None
+
+        # carve walls with an rng of its own so the agent's random is untouched,
+        # then find the path from start to end point and put a coin on every 4th grid of it
+        if not self.load_cache(seed, algorithm):
+            self.vertical_walls, self.horizontal_walls = MAZE_GENERATORS[algorithm](MAZE_SIZE[0], MAZE_SIZE[1], random.Random(seed))
+            self.path = self.find_path()
+            self.coin_grids = []
+            for i, grid in enumerate(self.path):
+                if i % 4 == 3:
+                    self.coin_grids.append(grid)
+            self.save_cache(seed, algorithm)
+        # coins left are a bitmask, bit i stands for coin_grids[i] and coin_index finds the bit of a grid
+        self.coin_index = {grid: idx for idx, grid in enumerate(self.coin_grids)}
+        self.all_coins_mask = (1 << len(self.coin_grids)) - 1
+        self.build_transitions()
+        # moves of the shortest route, the path is a BFS over the walls
+        self.optimal_moves = len(self.path) - 1
+
+    # coins bitmask without the coin of a grid, and whether there was one left there
+    def collect_coin(self, coins: int, grid: tuple[int, int]) -> tuple[int, bool]:
+        idx = self.coin_index.get(grid)
+        if idx == None or not coins >> idx & 1:
+            return coins, False
+        return coins ^ 1 << idx, True
+
+    # rects of the coins left in a bitmask
+    def coin_rects(self, coins: int) -> list[pygame.Rect]:
+        return [rect for idx, rect in enumerate(self.all_coins) if coins >> idx & 1]
+
+    # file of a maze in MAZE_CACHE_DIR
+    def cache_path(self, seed: int, algorithm: str) -> str:
+        return os.path.join(MAZE_CACHE_DIR, f'{algorithm}_{MAZE_SIZE[0]}x{MAZE_SIZE[1]}_{seed}.npz')
+
+    # load bit packed walls, path and coins of a cached maze, return whether it was cached
+    def load_cache(self, seed: int, algorithm: str) -> bool:
+        if MAZE_CACHE_DIR == None or not os.path.exists(self.cache_path(seed, algorithm)):
+            return False
+        rows, cols = MAZE_SIZE
+        with np.load(self.cache_path(seed, algorithm)) as cache:
+            self.vertical_walls = np.unpackbits(cache['vertical_walls'], count=rows * cols).reshape(rows, cols).view(bool)
+            self.horizontal_walls = np.unpackbits(cache['horizontal_walls'], count=rows * cols).reshape(rows, cols).view(bool)
+            self.path = list(map(tuple, cache['path'].tolist()))
+            self.coin_grids = list(map(tuple, cache['coin_grids'].tolist()))
+        return True
+
+    # write to a file of this process first, so workers caching the same maze never read half a file
+    def save_cache(self, seed: int, algorithm: str):
+        if MAZE_CACHE_DIR == None:
+            return
+        os.makedirs(MAZE_CACHE_DIR, exist_ok=True)
+        path = self.cache_path(seed, algorithm)
+        with open(f'{path}.{os.getpid()}.tmp', 'wb') as file:
+            np.savez(file, vertical_walls=np.packbits(self.vertical_walls), horizontal_walls=np.packbits(self.horizontal_walls), path=np.array(self.path, dtype=np.int32), coin_grids=np.array(self.coin_grids, dtype=np.int32).reshape(-1, 2))
+        os.replace(f'{path}.{os.getpid()}.tmp', path)
+
+    # compile next state of every (state, action) once, state index is row * cols + col
+    def build_transitions(self):
+        rows, cols = MAZE_SIZE
+        vertical_walls = self.vertical_walls
+        horizontal_walls = self.horizontal_walls
+
+        # blocked[row, col, action], the maze frame blocks too
+        blocked = np.ones((rows, cols, 4), dtype=bool)
+        blocked[1:, :, 0] = horizontal_walls[1:, :]
+        blocked[:, 1:, 1] = vertical_walls[:, 1:]
+        blocked[:-1, :, 2] = horizontal_walls[1:, :]
+        blocked[:, :-1, 3] = vertical_walls[:, 1:]
+
+        states = np.arange(rows * cols, dtype=np.int32).reshape(rows, cols)
+        transitions = np.stack([states - cols, states - 1, states + cols, states + 1], axis=2)
+        transitions[blocked] = np.broadcast_to(states[:, :, None], blocked.shape)[blocked]
+
+        self.blocked = blocked.reshape(-1, 4)
+        self.transitions = transitions.reshape(-1, 4)
+
+    # BFS path from start point to end point, unique in a perfect maze
+    def find_path(self) -> list[tuple[int, int]]:
+        rows, cols = MAZE_SIZE
+        end_grid = rows * cols - 1
+        vertical, horizontal = self.vertical_walls.tobytes(), self.horizontal_walls.tobytes()
+        parents = [-1] * (rows * cols)
+        parents[0] = 0
+        queue = [0]
+        for grid in queue:
+            if grid == end_grid:
+                break
+            col = grid % cols
+            neighbors = []
+            if grid >= cols and not horizontal[grid]:
+                neighbors.append(grid - cols)
+            if col > 0 and not vertical[grid]:
+                neighbors.append(grid - 1)
+            if grid < end_grid - cols + 1 and not horizontal[grid + cols]:
+                neighbors.append(grid + cols)
+            if col < cols - 1 and not vertical[grid + 1]:
+                neighbors.append(grid + 1)
+            for next_grid in neighbors:
+                if parents[next_grid] == -1:
+                    parents[next_grid] = grid
+                    queue.append(next_grid)
+
+        path = [end_grid]
+        while path[-1] != 0:
+            path.append(parents[path[-1]])
+        return [divmod(grid, cols) for grid in reversed(path)]
+
+    # next grid and if it moved after taking an action at a grid
+    def next_grid(self, grid: tuple[int, int], action: int) -> tuple[tuple[int, int], bool]:
+        state = grid[0] * MAZE_SIZE[1] + grid[1]
+        if self.blocked.item(state, action):
+            return grid, False
+        return divmod(self.transitions.item(state, action), MAZE_SIZE[1]), True
     
-    # draw maze
+    # draw maze from the cached static layer
     def draw(self):
+        if self.surface == None:
+            self.render_static()
+        WIN.blit(self.surface, (0, 0))
+
+    # render walls, start and end point once into a surface, redone only for a new maze
+    def render_static(self):
+        init_display()
+        surface = pygame.Surface((GAME_WIN_WIDTH, GAME_WIN_HEIGHT)).convert()
+        surface.fill(BACKGROUND_COLOR)
+
         # draw start and end point
-        WIN.blit(start_point_image, (self.start_point.x + GRID_WIDTH * 0.15, self.start_point.y + GRID_HEIGHT * 0.15))
-        WIN.blit(end_point_image, (self.end_point.x + GRID_WIDTH * 0.15, self.end_point.y + GRID_HEIGHT * 0.15))
+        surface.blit(start_point_image, (self.start_point.x + GRID_WIDTH * 0.15, self.start_point.y + GRID_HEIGHT * 0.15))
+        surface.blit(end_point_image, (self.end_point.x + GRID_WIDTH * 0.15, self.end_point.y + GRID_HEIGHT * 0.15))
 
         vertical_wall_image = pygame.transform.scale(wall_image, (WALL_WIDTH, GRID_HEIGHT + 2 * WALL_WIDTH))
-        horizontal_wall_image = pygame.transform.rotate(vertical_wall_image, 90)
+        horizontal_wall_image = pygame.transform.rotate(pygame.transform.scale(wall_image, (WALL_WIDTH, GRID_WIDTH + 2 * WALL_WIDTH)), 90)
         # draw maze wall
         for row in range(MAZE_SIZE[0]):
             for col in range(MAZE_SIZE[1]):
@@ -166,30 +787,32 @@ class Maze():
                 y_coord = row * (GRID_HEIGHT + WALL_WIDTH)
                 # vertical
                 if self.vertical_walls[row][col]:
-                    WIN.blit(vertical_wall_image, (x_coord, y_coord))
+                    surface.blit(vertical_wall_image, (x_coord, y_coord))
                 else:
-                    pygame.draw.rect(WIN, BORDER_COLOR, pygame.Rect(x_coord, y_coord + WALL_WIDTH, WALL_WIDTH, GRID_HEIGHT))
+                    pygame.draw.rect(surface, BORDER_COLOR, pygame.Rect(x_coord, y_coord + WALL_WIDTH, WALL_WIDTH, GRID_HEIGHT))
                 # horizontal
                 if self.horizontal_walls[row][col]:
-                    WIN.blit(horizontal_wall_image, (x_coord, y_coord))
+                    surface.blit(horizontal_wall_image, (x_coord, y_coord))
                 else:
-                    pygame.draw.rect(WIN, BORDER_COLOR, pygame.Rect(x_coord + WALL_WIDTH, y_coord, GRID_HEIGHT, WALL_WIDTH))
+                    pygame.draw.rect(surface, BORDER_COLOR, pygame.Rect(x_coord + WALL_WIDTH, y_coord, GRID_WIDTH, WALL_WIDTH))
 
         # draw maze frame
         # horizontal
         for col in range(MAZE_SIZE[1]):
             x_coord = col * (GRID_WIDTH + WALL_WIDTH)
             # up
-            WIN.blit(horizontal_wall_image, (x_coord, 0))
+            surface.blit(horizontal_wall_image, (x_coord, 0))
             # down
-            WIN.blit(horizontal_wall_image, (x_coord, GAME_WIN_HEIGHT - WALL_WIDTH))
+            surface.blit(horizontal_wall_image, (x_coord, GAME_WIN_HEIGHT - WALL_WIDTH))
         # vertical
         for row in range(MAZE_SIZE[0]):
             y_coord = row * (GRID_HEIGHT + WALL_WIDTH)
             # left
-            WIN.blit(vertical_wall_image, (0, y_coord))
+            surface.blit(vertical_wall_image, (0, y_coord))
             # right
-            WIN.blit(vertical_wall_image, (GAME_WIN_WIDTH - WALL_WIDTH, y_coord))
+            surface.blit(vertical_wall_image, (GAME_WIN_WIDTH - WALL_WIDTH, y_coord))
+
+        self.surface = surface
 
 # get all valid move of a grid
 def get_neighbor_girds(grid: tuple[int, int]) -> list[tuple[int, int]]:
@@ -205,21 +828,150 @@ def get_neighbor_girds(grid: tuple[int, int]) -> list[tuple[int, int]]:
         valid_moves.remove((1, 0))
     return valid_moves
 
+# q value overlay, one font and a cache of rendered numbers so a frame only renders new values
+class QValueOverlay():
+    def __init__(self):
+        self.font = None
+        self.text_cache = dict()
+
+    # rendered surface of a q value, cached by its formatted text
+    def render_value(self, value: float) -> pygame.Surface:
+        text = f'{value:.2f}'
+        surface = self.text_cache.get(text)
+        if surface == None:
+            if len(self.text_cache) >= Q_VALUE_TEXT_CACHE_SIZE:
+                self.text_cache.clear()
+            surface = self.font.render(text, True, TEXT_COLOR)
+            self.text_cache[text] = surface
+        return surface
+
+    # draw q values of one grid, rect is (x, y, width, height) of the grid inside its walls on screen
+    def draw_grid(self, q_learning: Qlearning, grid: tuple[int, int], rect: tuple[float, float, float, float] = None):
+        if self.font == None:
+            self.font = pygame.font.SysFont(FONT, int(0.14 * min(GRID_HEIGHT, GRID_WIDTH)))
+        row, col = grid
+        if rect == None:
+            rect = (col * (GRID_WIDTH + WALL_WIDTH) + WALL_WIDTH, row * (GRID_HEIGHT + WALL_WIDTH) + WALL_WIDTH, GRID_WIDTH, GRID_HEIGHT)
+        x_coord, y_coord, width, height = rect
+        actions_q_value = q_learning.q_table[(row, col)]
+        WIN.blit(self.render_value(actions_q_value[0]), (x_coord + width / 3, y_coord + height / 10))
+        WIN.blit(self.render_value(actions_q_value[1]), (x_coord + width / 8, y_coord + height * 4 / 9))
+        WIN.blit(self.render_value(actions_q_value[2]), (x_coord + width / 3, y_coord + height * 8 / 10))
+        WIN.blit(self.render_value(actions_q_value[3]), (x_coord + width * 5 / 9, y_coord + height *4 / 9))
+
+    # draw q values of every grid, and have the learner track updates for redrawing only what changed
+    def draw_all(self, q_learning: Qlearning):
+        q_learning.track_updates = True
+        for row in range(MAZE_SIZE[0]):
+            for col in range(MAZE_SIZE[1]):
+                self.draw_grid(q_learning, (row, col))
+        q_learning.updated_states.clear()
+
+    # grids whose q values changed since the last call, the learner tracks updates from the first call on
+    def take_updated_grids(self, q_learning: Qlearning) -> set[tuple[int, int]]:
+        q_learning.track_updates = True
+        updated_grids = set(q_learning.updated_states)
+        q_learning.updated_states.clear()
+        return updated_grids
+
+q_value_overlay = QValueOverlay()
+
 # draw q value
 def draw_q_values(q_learning: Qlearning):
-    font = pygame.font.SysFont(FONT, int(0.14 * min(GRID_HEIGHT, GRID_WIDTH)))
-    for row in range(MAZE_SIZE[0]):
-        for col in range(MAZE_SIZE[1]):
-            x_coord = col * (GRID_WIDTH + WALL_WIDTH)
-            y_coord = row * (GRID_HEIGHT + WALL_WIDTH)
-            WIN.blit(font.render(f'{q_learning.q_table[(row, col)][0]:.2f}', True, TEXT_COLOR), (x_coord + WALL_WIDTH + GRID_WIDTH / 3, y_coord + WALL_WIDTH + GRID_HEIGHT / 10))
-            WIN.blit(font.render(f'{q_learning.q_table[(row, col)][1]:.2f}', True, TEXT_COLOR), (x_coord + WALL_WIDTH + GRID_WIDTH / 8, y_coord + WALL_WIDTH + GRID_HEIGHT * 4 / 9))
-            WIN.blit(font.render(f'{q_learning.q_table[(row, col)][2]:.2f}', True, TEXT_COLOR), (x_coord + WALL_WIDTH + GRID_WIDTH / 3, y_coord + WALL_WIDTH + GRID_HEIGHT * 8 / 10))
-            WIN.blit(font.render(f'{q_learning.q_table[(row, col)][3]:.2f}', True, TEXT_COLOR), (x_coord + WALL_WIDTH + GRID_WIDTH * 5 / 9, y_coord + WALL_WIDTH + GRID_HEIGHT *4 / 9))
+    q_value_overlay.draw_all(q_learning)
+
+# view of the maze layout (the world of maze, coin and player rects) through the game area
+# scale is screen pixels per world pixel, (x, y) the world point at the top left of the game area
+class Camera():
+    def __init__(self):
+        self.scale = 1
+        self.x = 0
+        self.y = 0
+        # follow the agent by default when the maze does not fit
+        self.follow = WORLD_WIDTH > GAME_WIN_WIDTH or WORLD_HEIGHT > GAME_WIN_HEIGHT
+        self.images = dict()
+        self.q_value_overlay = QValueOverlay()
+        self.q_value_font_size = None
+        self.clamp()
+
+    # whole maze at its own size, drawn by draw_window with the cached maze surface
+    def is_identity(self) -> bool:
+        return self.scale == 1 and self.x == 0 and self.y == 0 and WORLD_WIDTH <= GAME_WIN_WIDTH and WORLD_HEIGHT <= GAME_WIN_HEIGHT
+
+    # zoomed out as far as showing the whole maze or CAMERA_MAX_VISIBLE_CELLS grids a side, never below 1 for mazes that fit
+    def min_scale(self) -> float:
+        fit_scale = min(GAME_WIN_WIDTH / WORLD_WIDTH, GAME_WIN_HEIGHT / WORLD_HEIGHT, 1)
+        return max(fit_scale, GAME_WIN_WIDTH / (CAMERA_MAX_VISIBLE_CELLS * (GRID_WIDTH + WALL_WIDTH)), GAME_WIN_HEIGHT / (CAMERA_MAX_VISIBLE_CELLS * (GRID_HEIGHT + WALL_WIDTH)))
+
+    # keep the view on the maze, center it when the maze is smaller than the view
+    def clamp(self):
+        view_width, view_height = GAME_WIN_WIDTH / self.scale, GAME_WIN_HEIGHT / self.scale
+        self.x = (WORLD_WIDTH - view_width) / 2 if view_width >= WORLD_WIDTH else min(max(self.x, 0), WORLD_WIDTH - view_width)
+        self.y = (WORLD_HEIGHT - view_height) / 2 if view_height >= WORLD_HEIGHT else min(max(self.y, 0), WORLD_HEIGHT - view_height)
+
+    # zoom by factor keeping the world point under anchor (screen pos) in place
+    def zoom(self, factor: float, anchor: tuple[int, int]):
+        scale = min(max(self.scale * factor, self.min_scale()), CAMERA_MAX_SCALE)
+        scale = 1 if abs(scale - 1) < 1e-6 else scale
+        self.x += anchor[0] / self.scale - anchor[0] / scale
+        self.y += anchor[1] / self.scale - anchor[1] / scale
+        self.scale = scale
+        self.images.clear()
+        self.clamp()
+
+    # move the view by screen pixels
+    def pan(self, dx: float, dy: float):
+        self.x += dx / self.scale
+        self.y += dy / self.scale
+        self.clamp()
+
+    def center_on(self, grid: tuple[int, int]):
+        self.x = (GRID_WIDTH + WALL_WIDTH) * grid[1] + WALL_WIDTH + GRID_WIDTH / 2 - GAME_WIN_WIDTH / 2 / self.scale
+        self.y = (GRID_HEIGHT + WALL_WIDTH) * grid[0] + WALL_WIDTH + GRID_HEIGHT / 2 - GAME_WIN_HEIGHT / 2 / self.scale
+        self.clamp()
+
+    def to_screen(self, x: float, y: float) -> tuple[float, float]:
+        return (x - self.x) * self.scale, (y - self.y) * self.scale
+
+    # (row start, row end, col start, col end) of the grids in view
+    def visible_grids(self) -> tuple[int, int, int, int]:
+        row_start = max(int(self.y // (GRID_HEIGHT + WALL_WIDTH)), 0)
+        row_end = min(int((self.y + GAME_WIN_HEIGHT / self.scale) // (GRID_HEIGHT + WALL_WIDTH)) + 1, MAZE_SIZE[0])
+        col_start = max(int(self.x // (GRID_WIDTH + WALL_WIDTH)), 0)
+        col_end = min(int((self.x + GAME_WIN_WIDTH / self.scale) // (GRID_WIDTH + WALL_WIDTH)) + 1, MAZE_SIZE[1])
+        return row_start, row_end, col_start, col_end
+
+    # image scaled to a world size at the current scale, rotate turns it 90 degrees after scaling
+    def image(self, image: pygame.Surface, width: float, height: float, rotate: bool = False) -> pygame.Surface:
+        size = (max(int(width * self.scale), 1), max(int(height * self.scale), 1))
+        key = (id(image), size, rotate)
+        if key not in self.images:
+            self.images[key] = pygame.transform.rotate(pygame.transform.scale(image, (size[1], size[0])), 90) if rotate else pygame.transform.scale(image, size)
+        return self.images[key]
+
+    # mouse wheel zooms at the mouse, wasd pans, f toggles following the agent, return whether the view changed
+    def handle_event(self, event) -> bool:
+        if event.type == pygame.MOUSEWHEEL and pygame.mouse.get_pos()[0] < GAME_WIN_WIDTH:
+            self.zoom(CAMERA_ZOOM_STEP ** event.y, pygame.mouse.get_pos())
+            return True
+        if event.type == pygame.KEYDOWN and event.key in [pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d]:
+            direction = {pygame.K_w: (0, -1), pygame.K_a: (-1, 0), pygame.K_s: (0, 1), pygame.K_d: (1, 0)}[event.key]
+            self.follow = False
+            self.pan(direction[0] * GAME_WIN_WIDTH / 4, direction[1] * GAME_WIN_HEIGHT / 4)
+            return True
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_f:
+            self.follow = not self.follow
+            return True
+        return False
+
+# rect inside the walls of a grid
+def grid_rect(grid: tuple[int, int]) -> pygame.Rect:
+    return pygame.Rect((WALL_WIDTH + GRID_WIDTH) * grid[1] + WALL_WIDTH, (WALL_WIDTH + GRID_HEIGHT) * grid[0] + WALL_WIDTH, GRID_WIDTH, GRID_HEIGHT)
 
 # player class
 class Player():
     def __init__(self):
+        load_pygame()
         self.rect = pygame.Rect(WALL_WIDTH + GRID_WIDTH / 2  - PLAYER_WIDTH / 2, WALL_WIDTH + GRID_HEIGHT / 2  - PLAYER_HEIGHT / 2, PLAYER_WIDTH, PLAYER_HEIGHT)
         self.pos = (0, 0)
         self.direction = "d"
@@ -260,16 +1012,24 @@ class Select_buttons():
 
 # panel class
 class Panel():
-    def __init__(self):
+    # info_lines text lines at the top, set with set_info_lines
+    def __init__(self, info_lines: int = 5):
         self.texts = []
         self.texts_pos = []
+        self.info_lines = [None] * info_lines
+        self.font = None
         self.show_hide_q_values_buttons = Select_buttons(2)
         self.show_hide_q_values_buttons.buttons[0].select = True
         self.speed_buttons = Select_buttons(5)
         self.speed_buttons.buttons[2].select = True
+        self.profile_texts = []
+        self.profile_pos = None
+        self.profile_font = None
     
     def init_panel(self):
         font = pygame.font.SysFont(FONT, FONT_SIZE)
+        self.font = font
+        self.texts = [font.render('', True, TEXT_COLOR) for _ in self.info_lines]
         
         # init texts pos
         y_coord = 20
@@ -292,6 +1052,42 @@ class Panel():
         for i in range(5):
             self.speed_buttons.buttons[i].word, self.speed_buttons.buttons[i].word_pos = font.render(f'{i + 1}', True, TEXT_COLOR), (GAME_WIN_WIDTH + 30 + (8 + 2 * i) * FONT_SIZE * 0.52, y_coord)
             self.speed_buttons.buttons[i].rect = pygame.Rect(GAME_WIN_WIDTH + 30 + (8 + 2 * i - 0.4) * FONT_SIZE * 0.52, y_coord + FONT_SIZE * 0.03, 2 * FONT_SIZE * 0.52, FONT_SIZE * 1.3)
+        y_coord += FONT_SIZE * 13 / 9
+
+        # init profile readout under the buttons
+        self.profile_pos = (GAME_WIN_WIDTH + 30, y_coord)
+
+    # render the info text lines that changed, return their indexes for update_window
+    def set_info_lines(self, lines: list[str]) -> list[int]:
+        dirty_texts = []
+        for idx, line in enumerate(lines):
+            if line != self.info_lines[idx]:
+                self.texts[idx] = self.font.render(line, True, TEXT_COLOR)
+                self.info_lines[idx] = line
+                dirty_texts.append(idx)
+        return dirty_texts
+
+    # rect of an info text line
+    def text_rect(self, idx: int) -> pygame.Rect:
+        return pygame.Rect(self.texts_pos[idx][0], self.texts_pos[idx][1], WIN_WIDTH - self.texts_pos[idx][0], FONT_SIZE * 13 / 9)
+
+    # render profile readout lines with a small font
+    def set_profile_lines(self, lines: list[str]):
+        if self.profile_font == None:
+            self.profile_font = pygame.font.SysFont(FONT, PROFILE_FONT_SIZE)
+        self.profile_texts = [self.profile_font.render(line, True, TEXT_COLOR) for line in lines]
+
+    # rect of the profile readout area
+    def profile_rect(self) -> pygame.Rect:
+        return pygame.Rect(self.profile_pos[0], self.profile_pos[1], WIN_WIDTH - self.profile_pos[0], WIN_HEIGHT - self.profile_pos[1])
+
+    # redraw only the profile readout
+    def draw_profile(self):
+        rect = self.profile_rect()
+        WIN.fill(BACKGROUND_COLOR, rect)
+        for idx, text in enumerate(self.profile_texts):
+            WIN.blit(text, (self.profile_pos[0], self.profile_pos[1] + idx * PROFILE_FONT_SIZE * 4 / 3))
+        pygame.display.update(rect)
 
     # draw panel
     def draw(self):
@@ -310,8 +1106,14 @@ class Panel():
         for i in range(5):
             self.speed_buttons.buttons[i].draw()
 
+        # draw profile readout
+        for idx, text in enumerate(self.profile_texts):
+            WIN.blit(text, (self.profile_pos[0], self.profile_pos[1] + idx * PROFILE_FONT_SIZE * 4 / 3))
+
 # draw window
-def draw_window(maze: Maze, coins: list[pygame.Rect], player: Player, q_learning: Qlearning, panel: Panel, display_q_values: bool):
+def draw_window(maze: Maze, coins: int, player: Player, q_learning: Qlearning, panel: Panel, display_q_values: bool):
+    init_display()
+
     # draw background
     WIN.fill(BACKGROUND_COLOR)
     
@@ -319,7 +1121,7 @@ def draw_window(maze: Maze, coins: list[pygame.Rect], player: Player, q_learning
     maze.draw()
 
     # draw coin
-    for coin in coins:
+    for coin in maze.coin_rects(coins):
         WIN.blit(coin_image, coin)
 
     # draw q values
@@ -327,6 +1129,103 @@ def draw_window(maze: Maze, coins: list[pygame.Rect], player: Player, q_learning
         draw_q_values(q_learning)
 
     # draw player 
+    draw_player(player)
+
+    # draw panel
+    panel.draw()
+
+    # upadate window
+    pygame.display.update()
+
+# draw window through a camera, only walls, coins and q values of grids in view are drawn
+def draw_camera_window(maze: Maze, coins: int, player: Player, q_learning: Qlearning, panel: Panel, display_q_values: bool, camera: Camera):
+    init_display()
+    row_start, row_end, col_start, col_end = camera.visible_grids()
+    view = pygame.Rect(camera.x, camera.y, GAME_WIN_WIDTH / camera.scale + 1, GAME_WIN_HEIGHT / camera.scale + 1)
+    scale = camera.scale
+
+    # draw background, keep the maze out of the panel
+    WIN.fill(BACKGROUND_COLOR)
+    WIN.set_clip(pygame.Rect(0, 0, GAME_WIN_WIDTH, GAME_WIN_HEIGHT))
+
+    # draw start and end point
+    for rect, image in [(maze.start_point, start_point_image), (maze.end_point, end_point_image)]:
+        if view.colliderect(rect):
+            WIN.blit(camera.image(image, GRID_WIDTH * 0.7, GRID_HEIGHT * 0.7), camera.to_screen(rect.x + GRID_WIDTH * 0.15, rect.y + GRID_HEIGHT * 0.15))
+
+    # draw maze wall of the grids in view
+    vertical_wall_image = camera.image(wall_image, WALL_WIDTH, GRID_HEIGHT + 2 * WALL_WIDTH)
+    horizontal_wall_image = camera.image(wall_image, GRID_WIDTH + 2 * WALL_WIDTH, WALL_WIDTH, True)
+    for row in range(row_start, row_end):
+        for col in range(col_start, col_end):
+            x_coord, y_coord = camera.to_screen(col * (GRID_WIDTH + WALL_WIDTH), row * (GRID_HEIGHT + WALL_WIDTH))
+            # vertical
+            if maze.vertical_walls[row][col]:
+                WIN.blit(vertical_wall_image, (x_coord, y_coord))
+            else:
+                pygame.draw.rect(WIN, BORDER_COLOR, pygame.Rect(x_coord, y_coord + WALL_WIDTH * scale, WALL_WIDTH * scale, GRID_HEIGHT * scale))
+            # horizontal
+            if maze.horizontal_walls[row][col]:
+                WIN.blit(horizontal_wall_image, (x_coord, y_coord))
+            else:
+                pygame.draw.rect(WIN, BORDER_COLOR, pygame.Rect(x_coord + WALL_WIDTH * scale, y_coord, GRID_WIDTH * scale, WALL_WIDTH * scale))
+
+    # draw maze frame in view
+    # horizontal
+    for col in range(col_start, col_end):
+        x_coord = col * (GRID_WIDTH + WALL_WIDTH)
+        WIN.blit(horizontal_wall_image, camera.to_screen(x_coord, 0))
+        WIN.blit(horizontal_wall_image, camera.to_screen(x_coord, WORLD_HEIGHT - WALL_WIDTH))
+    # vertical
+    for row in range(row_start, row_end):
+        y_coord = row * (GRID_HEIGHT + WALL_WIDTH)
+        WIN.blit(vertical_wall_image, camera.to_screen(0, y_coord))
+        WIN.blit(vertical_wall_image, camera.to_screen(WORLD_WIDTH - WALL_WIDTH, y_coord))
+
+    # draw coin left on the grids in view
+    coin = camera.image(coin_image, GRID_WIDTH * 0.4, GRID_HEIGHT * 0.4)
+    for row in range(row_start, row_end):
+        for col in range(col_start, col_end):
+            idx = maze.coin_index.get((row, col))
+            if idx != None and coins >> idx & 1:
+                rect = maze.all_coins[idx]
+                WIN.blit(coin, camera.to_screen(rect.x, rect.y))
+
+    # draw q values once they are large enough to read
+    font_size = int(0.14 * min(GRID_HEIGHT, GRID_WIDTH) * scale)
+    if display_q_values and font_size >= CAMERA_MIN_Q_VALUE_FONT_SIZE:
+        if font_size != camera.q_value_font_size:
+            camera.q_value_overlay.font = pygame.font.SysFont(FONT, font_size)
+            camera.q_value_overlay.text_cache.clear()
+            camera.q_value_font_size = font_size
+        for row in range(row_start, row_end):
+            for col in range(col_start, col_end):
+                x_coord, y_coord = camera.to_screen((GRID_WIDTH + WALL_WIDTH) * col + WALL_WIDTH, (GRID_HEIGHT + WALL_WIDTH) * row + WALL_WIDTH)
+                camera.q_value_overlay.draw_grid(q_learning, (row, col), (x_coord, y_coord, GRID_WIDTH * scale, GRID_HEIGHT * scale))
+    q_learning.updated_states.clear()
+
+    # draw player
+    player_image = {"u": player_up, "d": player_down, "l": player_left, "r": player_right}[player.direction]
+    WIN.blit(camera.image(player_image, PLAYER_WIDTH, PLAYER_HEIGHT), camera.to_screen(player.rect.x, player.rect.y))
+
+    # draw panel
+    WIN.set_clip(None)
+    panel.draw()
+
+    # upadate window
+    pygame.display.update()
+
+# full redraw, through the camera unless it shows the whole maze as laid out
+def draw_view(maze: Maze, coins: int, player: Player, q_learning: Qlearning, panel: Panel, display_q_values: bool, camera: Camera):
+    if camera.follow:
+        camera.center_on(player.pos)
+    if camera.is_identity():
+        draw_window(maze, coins, player, q_learning, panel, display_q_values)
+    else:
+        draw_camera_window(maze, coins, player, q_learning, panel, display_q_values, camera)
+
+# draw player sprite facing its direction
+def draw_player(player: Player):
     if player.direction == "u":
         WIN.blit(player_up, player)
     elif player.direction == "d":
@@ -336,24 +1235,47 @@ def draw_window(maze: Maze, coins: list[pygame.Rect], player: Player, q_learning
     elif player.direction == "l":
         WIN.blit(player_left, player)
 
-    # draw panel
-    panel.draw()
+# redraw only the changed grids and panel text lines
+def update_window(maze: Maze, coins: int, player: Player, q_learning: Qlearning, panel: Panel, display_q_values: bool, dirty_grids: set[tuple[int, int]], dirty_texts: list[int]):
+    dirty_rects = []
+    for grid in dirty_grids:
+        rect = grid_rect(grid)
+        dirty_rects.append(rect)
 
-    # upadate window
-    pygame.display.update()
+        # restore static maze, then coin, q values and player on top
+        WIN.blit(maze.surface, rect, rect)
+        idx = maze.coin_index.get(grid)
+        if idx != None and coins >> idx & 1:
+            WIN.blit(coin_image, maze.all_coins[idx])
+        if display_q_values:
+            q_value_overlay.draw_grid(q_learning, grid)
+        if player.rect.colliderect(rect):
+            draw_player(player)
+
+    for idx in dirty_texts:
+        rect = panel.text_rect(idx)
+        dirty_rects.append(rect)
+        WIN.fill(BACKGROUND_COLOR, rect)
+        WIN.blit(panel.texts[idx], panel.texts_pos[idx])
+
+    pygame.display.update(dirty_rects)
 
 # get all valid moves of the position
 def get_valid_moves(maze: Maze, player: Player) -> list[tuple[int, int]]:
-    neighbor_grids = get_neighbor_girds(player.pos)
+    return get_grid_valid_moves(maze, player.pos)
+
+# get all valid moves of a grid
+def get_grid_valid_moves(maze: Maze, grid: tuple[int, int]) -> list[tuple[int, int]]:
+    neighbor_grids = get_neighbor_girds(grid)
 
     valid_moves = []
-    if ((0, -1) in neighbor_grids) and (maze.vertical_walls[player.pos[0]][player.pos[1]] == False):
+    if ((0, -1) in neighbor_grids) and (maze.vertical_walls[grid[0]][grid[1]] == False):
         valid_moves.append((0, -1))
-    if ((0, 1) in neighbor_grids) and (maze.vertical_walls[player.pos[0]][player.pos[1] + 1] == False):
+    if ((0, 1) in neighbor_grids) and (maze.vertical_walls[grid[0]][grid[1] + 1] == False):
         valid_moves.append((0, 1))
-    if ((-1, 0) in neighbor_grids) and (maze.horizontal_walls[player.pos[0]][player.pos[1]] == False):
+    if ((-1, 0) in neighbor_grids) and (maze.horizontal_walls[grid[0]][grid[1]] == False):
         valid_moves.append((-1, 0))
-    if ((1, 0) in neighbor_grids) and (maze.horizontal_walls[player.pos[0] + 1][player.pos[1]] == False):
+    if ((1, 0) in neighbor_grids) and (maze.horizontal_walls[grid[0] + 1][grid[1]] == False):
         valid_moves.append((1, 0))
 
     return valid_moves
@@ -372,35 +1294,30 @@ def move_player_keyboard(maze: Maze, player: Player, keys_pressed):
 
     return player
 
-# move player with input action
-def move_player(maze: Maze, player: Player, action: str) -> bool:
-    valid_moves = get_valid_moves(maze, player)
-    moved = False
-    if action == 0:
-        if (-1, 0) in valid_moves:
-            player.pos = (player.pos[0] - 1, player.pos[1])
-            moved = True
-        player.direction = "u"
-    elif action == 1:
-        if (0, -1) in valid_moves:
-            player.pos = (player.pos[0], player.pos[1] - 1)
-            moved = True
-        player.direction = "l"
-    elif action == 2:
-        if (1, 0) in valid_moves:
-            player.pos = (player.pos[0] + 1, player.pos[1])
-            moved = True
-        player.direction = "d"
-    elif action == 3:
-        if (0, 1) in valid_moves:
-            player.pos = (player.pos[0], player.pos[1] + 1)
-            moved = True
-        player.direction = "r"
+# put the player on a grid, facing the way of the action that took it there
+def place_player(player: Player, pos: tuple[int, int], action: int):
+    player.pos = pos
+    player.direction = "uldr"[action]
     player.rect.x = (WALL_WIDTH + GRID_WIDTH) * player.pos[1] + WALL_WIDTH + GRID_WIDTH / 2  - PLAYER_WIDTH / 2
     player.rect.y = (WALL_WIDTH + GRID_HEIGHT) * player.pos[0] + WALL_WIDTH + GRID_HEIGHT / 2  - PLAYER_HEIGHT / 2
 
+# move player with input action
+def move_player(maze: Maze, player: Player, action: int) -> bool:
+    pos, moved = maze.next_grid(player.pos, action)
+    place_player(player, pos, action)
+
     return moved
 
+# panel info lines of a training run
+def training_info_lines(episode: int, move_left: int, epsilon: float, first_finish_episode: int, minium_move_spent: int) -> list[str]:
+    return [
+        f'episode num: {episode}',
+        f'move left: {move_left}',
+        f'epsilon: {epsilon:.6f}',
+        f'first success: {first_finish_episode if first_finish_episode != None else " "}',
+        f'fastest: {minium_move_spent if minium_move_spent != None else " "} moves',
+    ]
+
 # new game (to be fix)
 def new_game(maze: Maze, player: Player):
     maze = Maze()
@@ -416,35 +1333,968 @@ def reset_game(player: Player) -> Player:
 
 # endregion maze game
 
+# region headless training
+# maze environment on grid positions only, same reward rules as the game loop
+class MazeEnv():
+    # coin_state makes states integer keys of the position and the coins collected so far, see state_key
+    def __init__(self, maze: Maze, coin_state: bool = False):
+        self.maze = maze
+        self.coin_state = coin_state
+        self.end_grid = (MAZE_SIZE[0] - 1, MAZE_SIZE[1] - 1)
+        self.reset()
+
+    # back to start point, return start state, the (row, col) position or with coin_state its integer key
+    def reset(self) -> tuple[int, int] | int:
+        self.pos = (0, 0)
+        self.last_pos = None
+        self.last_last_pos = None
+        self.coins = self.maze.all_coins_mask
+        self.move_left = MOVE_PER_EPISODE
+        return self.state_key() if self.coin_state else self.pos
+
+    # collected coins bitmask * rows * cols + row * cols + col, so the flat grid is the key modulo rows * cols
+    def state_key(self) -> int:
+        return ((self.maze.all_coins_mask ^ self.coins) * MAZE_SIZE[0] + self.pos[0]) * MAZE_SIZE[1] + self.pos[1]
+
+    # make a move, return (next state, reward, finished, done)
+    def step(self, action: int) -> tuple[tuple[int, int] | int, int, bool, bool]:
+        self.pos, moved = self.maze.next_grid(self.pos, action)
+        self.move_left -= 1
+
+        # calculate reward, the coin and backtrack parts are also kept on their own,
+        # they depend on the moves before and not only on this one
+        reward = 0
+        if not moved:
+            reward -= 1
+        finished = self.pos == self.end_grid
+        if finished:
+            reward += 100
+        self.coins, collected = self.maze.collect_coin(self.coins, self.pos)
+        self.coin_reward = 5 if collected else 0
+        self.backtrack_reward = -1 if self.pos == self.last_last_pos else 0
+        reward += self.coin_reward + self.backtrack_reward
+
+        # update pos history
+        self.last_last_pos = self.last_pos
+        self.last_pos = self.pos
+
+        return self.state_key() if self.coin_state else self.pos, reward, finished, finished or self.move_left == 0
+
+# follows Q value change and the greedy policy using only the states updated each episode,
+# the greedy rollout from the start point is redone only when a greedy action changed
+# converged once the rollout takes maze.optimal_moves and stayed the same (and Q changed by at most tolerance) for window episodes
+class ConvergenceTracker():
+    def __init__(self, maze: Maze, q_learning: Qlearning, window: int = 10, tolerance: float = None):
+        self.maze = maze
+        self.window = window
+        self.tolerance = tolerance
+        q_learning.track_updates = True
+        self.q_values = q_table_array(q_learning, '<f8').reshape(-1, 4)
+        self.greedy_actions = self.q_values.argmax(axis=1)
+        self.path = self.rollout()
+        self.q_change = 0.0
+        self.stable_episodes = 0
+
+    # flat states of the greedy path from the start point
+    def rollout(self) -> list[int]:
+        end_state = MAZE_SIZE[0] * MAZE_SIZE[1] - 1
+        path = [0]
+        while path[-1] != end_state and len(path) <= MOVE_PER_EPISODE:
+            path.append(int(self.maze.transitions[path[-1], self.greedy_actions[path[-1]]]))
+        return path
+
+    def solved(self) -> bool:
+        return len(self.path) - 1 == self.maze.optimal_moves
+
+    # fold in the states updated during an episode, return whether training converged
+    def update(self, q_learning: Qlearning, states: set[tuple[int, int]]) -> bool:
+        states = list(states)
+        idx = np.array([row * MAZE_SIZE[1] + col for row, col in states], dtype=np.int64)
+        if isinstance(q_learning, ArrayQlearning):
+            q_values = q_learning.flat_q_table[idx].astype(np.float64)
+        else:
+            q_values = np.array([q_learning.q_table[state] for state in states], dtype=np.float64).reshape(-1, 4)
+        self.q_change = float(np.abs(q_values - self.q_values[idx]).max()) if len(states) > 0 else 0.0
+        self.q_values[idx] = q_values
+
+        path = self.path
+        greedy_actions = q_values.argmax(axis=1)
+        if (greedy_actions != self.greedy_actions[idx]).any():
+            self.greedy_actions[idx] = greedy_actions
+            self.path = self.rollout()
+
+        if self.path == path and self.solved() and (self.tolerance == None or self.q_change <= self.tolerance):
+            self.stable_episodes += 1
+        else:
+            self.stable_episodes = 0
+        return self.stable_episodes >= self.window
+
+# train until the greedy path from the start point is as short as the maze path
+# return (solved episode or None, environment steps, seconds)
+def train_until_solved(maze: Maze, q_learning: Qlearning, max_episodes: int) -> tuple[int, int, float]:
+    env = MazeEnv(maze)
+    tracker = ConvergenceTracker(maze, q_learning)
+    total_steps = 0
+
+    start_time = time.perf_counter()
+    while q_learning.current_episode <= max_episodes:
+        state = env.reset()
+        done = False
+        while not done:
+            action = q_learning.choose_action(state)
+            next_state, reward, finished, done = env.step(action)
+            q_learning.update_q_value(state, next_state, action, reward, reward - env.coin_reward)
+            state = next_state
+            total_steps += 1
+        tracker.update(q_learning, q_learning.updated_states)
+        q_learning.updated_states.clear()
+        if tracker.solved():
+            return q_learning.current_episode, total_steps, time.perf_counter() - start_time
+        q_learning.end_episode()
+    return None, total_steps, time.perf_counter() - start_time
+
+# train without rendering as fast as possible, return training stats
+# with a checkpoint, resume from it if it exists and save to it when done
+# planning 'dyna' or 'prioritized' trains a DynaQlearning with planning_steps backups per move
+# replay 'uniform' or 'prioritized' trains a ReplayQlearning with a replay_batch minibatch per move
+# with a trajectory path, every episode's actions and a Q table snapshot every snapshot_every episodes are logged to it
+# with early_stop, stop once the greedy path is optimal and stable for that many episodes (and Q changes by at most tolerance)
+def train_headless(episodes: int, seed: int = None, log_every: int = 0, q_table: str = 'dict', algorithm: str = 'dfs', epsilon_decay: float = 0.99, learning_rate: float = 0.1, discount_factor: float = 0.8, checkpoint: str = None, profiler: Profiler = None, planning: str = None, planning_steps: int = 10, replay: str = None, replay_batch: int = 32, trajectory: str = None, snapshot_every: int = 10, early_stop: int = 0, tolerance: float = None, coin_state: bool = False) -> dict:
+    # coin aware keys only fit the sparse Q table, it has no grid layout for checkpoints, trajectory snapshots or the convergence tracker
+    if coin_state and (planning != None or replay != None or checkpoint != None or trajectory != None or early_stop > 0):
+        raise ValueError('coin aware states only work with plain Q learning, without checkpoint, trajectory or early stop')
+    # the planning model only lives in memory and is keyed by (row, col) tuples of the dict Q table
+    if planning != None and (checkpoint != None or q_table == 'array'):
+        raise ValueError('planning works with the dict Q table and without checkpoint')
+    # a checkpoint holds the Q table but not the replay buffer
+    if replay != None and checkpoint != None:
+        raise ValueError('replay works without checkpoint')
+    profiler = profiler if profiler != None else Profiler()
+    if checkpoint != None and os.path.exists(checkpoint):
+        maze, q_learning, first_finish_episode, minium_move_spent = load_checkpoint(checkpoint)
+        minium_move_spent = minium_move_spent if minium_move_spent != None else 1e9
+        q_learning.episodes = episodes
+    else:
+        maze = Maze(seed, algorithm)
+        # seed exploration with the maze seed so a run repeats
+        random.seed(maze.seed)
+        if planning != None:
+            q_learning = DynaQlearning(episodes, epsilon_decay, learning_rate, discount_factor, planning, planning_steps)
+        elif replay != None:
+            q_learning = ReplayQlearning(episodes, epsilon_decay, learning_rate, discount_factor, batch_size=replay_batch, prioritized=replay == 'prioritized')
+        elif coin_state:
+            q_learning = SparseQlearning(episodes, epsilon_decay, learning_rate, discount_factor)
+        else:
+            q_learning = (ArrayQlearning if q_table == 'array' else Qlearning)(episodes, epsilon_decay, learning_rate, discount_factor)
+        first_finish_episode = None
+        minium_move_spent = 1e9
+    env = MazeEnv(maze, coin_state)
+    writer = TrajectoryWriter(trajectory, maze, snapshot_every) if trajectory != None else None
+    tracker = ConvergenceTracker(maze, q_learning, early_stop, tolerance) if early_stop > 0 else None
+    converged_episode = None
+    total_steps = 0
+    profiled = profiler.enabled
+
+    start_time = time.perf_counter()
+    while q_learning.current_episode <= episodes:
+        state = env.reset()
+        done = False
+        if writer != None:
+            writer.begin_episode(q_learning.current_episode, q_learning)
+            actions = bytearray()
+        # the same steps untimed when the profiler is off, so it costs no calls per step
+        if not profiled:
+            while not done:
+                action = q_learning.choose_action(state)
+                if writer != None:
+                    actions.append(action)
+                next_state, reward, finished, done = env.step(action)
+                q_learning.update_q_value(state, next_state, action, reward, reward - env.coin_reward)
+                state = next_state
+                total_steps += 1
+        else:
+            while not done:
+                lap_time = profiler.start()
+                action = q_learning.choose_action(state)
+                if writer != None:
+                    actions.append(action)
+                lap_time = profiler.lap('choose_action', lap_time)
+                next_state, reward, finished, done = env.step(action)
+                lap_time = profiler.lap('env_step', lap_time)
+                q_learning.update_q_value(state, next_state, action, reward, reward - env.coin_reward)
+                profiler.lap('update_q_value', lap_time)
+                profiler.end_step()
+                state = next_state
+                total_steps += 1
+
+        if writer != None:
+            writer.end_episode(q_learning.current_episode, actions)
+        if finished:
+            if first_finish_episode == None:
+                first_finish_episode = q_learning.current_episode
+            minium_move_spent = min(minium_move_spent, MOVE_PER_EPISODE - env.move_left)
+        if tracker != None:
+            converged = tracker.update(q_learning, q_learning.updated_states)
+            q_learning.updated_states.clear()
+        if log_every > 0 and q_learning.current_episode % log_every == 0:
+            print(f'episode {q_learning.current_episode}: epsilon {q_learning.epsilon:.6f}, moves {MOVE_PER_EPISODE - env.move_left}' + (f', greedy moves {len(tracker.path) - 1}/{maze.optimal_moves}, max Q change {tracker.q_change:.4f}' if tracker != None else ''))
+        if tracker != None and converged:
+            converged_episode = q_learning.current_episode
+            q_learning.end_episode()
+            break
+        q_learning.end_episode()
+    elapsed = time.perf_counter() - start_time
+
+    if writer != None:
+        writer.close()
+    if checkpoint != None:
+        save_checkpoint(checkpoint, maze, q_learning, first_finish_episode, minium_move_spent if minium_move_spent != 1e9 else None)
+    profiler.close()
+
+    return {
+        'seed': maze.seed,
+        # episodes trained, fewer than asked for when early_stop ended the run
+        'episodes': q_learning.current_episode - 1,
+        'steps': total_steps,
+        'seconds': elapsed,
+        'steps_per_sec': total_steps / elapsed if elapsed > 0 else float('inf'),
+        'first_success': first_finish_episode,
+        'fastest': minium_move_spent if minium_move_spent != 1e9 else None,
+        'converged': converged_episode,
+        'q_learning': q_learning,
+    }
+
+# endregion headless training
+
+# region batch environment
+# many mazes stepped in lockstep with numpy, states are flat grid indexes row * cols + col
+class BatchMazeEnv():
+    def __init__(self, seeds: list[int], algorithm: str = 'dfs'):
+        self.mazes = [Maze(seed, algorithm) for seed in seeds]
+        self.size = len(self.mazes)
+        self.index = np.arange(self.size)
+        self.end_state = MAZE_SIZE[0] * MAZE_SIZE[1] - 1
+
+        # (B, rows * cols, 4) transition tables and (B, rows * cols) coin masks
+        self.transitions = np.stack([maze.transitions for maze in self.mazes])
+        self.blocked = np.stack([maze.blocked for maze in self.mazes])
+        self.all_coins = np.zeros((self.size, MAZE_SIZE[0] * MAZE_SIZE[1]), dtype=bool)
+        for idx, maze in enumerate(self.mazes):
+            for grid in maze.coin_grids:
+                self.all_coins[idx, grid[0] * MAZE_SIZE[1] + grid[1]] = True
+
+        self.states = np.zeros(self.size, dtype=np.int32)
+        self.last_states = np.full(self.size, -1, dtype=np.int32)
+        self.last_last_states = np.full(self.size, -1, dtype=np.int32)
+        self.coins = self.all_coins.copy()
+        self.move_left = np.full(self.size, MOVE_PER_EPISODE, dtype=np.int32)
+
+    # back to start point for every environment, or only the masked ones
+    def reset(self, mask: np.ndarray = None) -> np.ndarray:
+        if mask is None:
+            mask = np.ones(self.size, dtype=bool)
+        self.states[mask] = 0
+        self.last_states[mask] = -1
+        self.last_last_states[mask] = -1
+        self.coins[mask] = self.all_coins[mask]
+        self.move_left[mask] = MOVE_PER_EPISODE
+        return self.states
+
+    # make one move in every environment, return (next states, rewards, finished, done)
+    # done environments are reset afterwards, self.states holds the states to act from next
+    def step(self, actions: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        next_states = self.transitions[self.index, self.states, actions]
+        self.move_left -= 1
+
+        # calculate reward, same rules as the game loop
+        rewards = -self.blocked[self.index, self.states, actions].astype(np.int32)
+        finished = next_states == self.end_state
+        rewards += 100 * finished
+        rewards += 5 * self.coins[self.index, next_states]
+        self.coins[self.index, next_states] = False
+        rewards -= next_states == self.last_last_states
+
+        # update state history
+        self.last_last_states = self.last_states
+        self.last_states = next_states.copy()
+        self.states = next_states.copy()
+
+        done = finished | (self.move_left == 0)
+        self.reset(done)
+        return next_states, rewards, finished, done
+
+# train one Q table per maze in lockstep, same update rule as Qlearning, return training stats
+def train_batch(episodes: int, seeds: list[int], algorithm: str = 'dfs', epsilon_decay: float = 0.99, learning_rate: float = 0.1, discount_factor: float = 0.8) -> dict:
+    env = BatchMazeEnv(seeds, algorithm)
+    rng = np.random.default_rng(seeds[0])
+    q_tables = np.zeros((env.size, MAZE_SIZE[0] * MAZE_SIZE[1], 4), dtype=np.float32)
+    epsilon = np.ones(env.size)
+    current_episode = np.ones(env.size, dtype=np.int32)
+    first_finish_episode = np.zeros(env.size, dtype=np.int32)
+    minium_move_spent = np.full(env.size, MOVE_PER_EPISODE + 1, dtype=np.int32)
+    total_steps = 0
+
+    start_time = time.perf_counter()
+    states = env.reset()
+    while current_episode.min() <= episodes:
+        # environments past their episodes keep stepping but stop learning
+        active = current_episode <= episodes
+
+        # choose actions
+        explore = rng.random(env.size) < epsilon
+        actions = np.where(explore, rng.integers(0, 4, env.size), q_tables[env.index, states].argmax(axis=1))
+        move_spent = MOVE_PER_EPISODE - env.move_left + 1
+        next_states, rewards, finished, done = env.step(actions)
+
+        # update Q tables
+        explore = rng.random(env.size) < epsilon
+        future_rewards = np.where(explore, q_tables[env.index, next_states, rng.integers(0, 4, env.size)], q_tables[env.index, next_states].max(axis=1))
+        q_values = q_tables[env.index, states, actions]
+        q_tables[env.index, states, actions] = q_values + active * learning_rate * (rewards + discount_factor * future_rewards - q_values)
+        total_steps += int(active.sum())
+
+        # track stats and end episodes
+        success = finished & active
+        first_finish_episode = np.where(success & (first_finish_episode == 0), current_episode, first_finish_episode)
+        minium_move_spent = np.where(success, np.minimum(minium_move_spent, move_spent), minium_move_spent)
+        epsilon = np.where(done, epsilon * epsilon_decay, epsilon)
+        current_episode += done
+        states = env.states
+    elapsed = time.perf_counter() - start_time
+
+    return {
+        'seeds': list(seeds),
+        'episodes': episodes,
+        'steps': total_steps,
+        'seconds': elapsed,
+        'steps_per_sec': total_steps / elapsed if elapsed > 0 else float('inf'),
+        'first_success': [int(e) if e > 0 else None for e in first_finish_episode],
+        'fastest': [int(m) if m <= MOVE_PER_EPISODE else None for m in minium_move_spent],
+        'q_tables': q_tables,
+    }
+
+# endregion batch environment
+
+# region checkpoint
+# checkpoint file layout, all little endian:
+#   8 bytes magic, uint32 metadata length, utf-8 json metadata, zero padding to CHECKPOINT_ALIGN,
+#   Q table of shape (rows, cols, 4) in C order, so it can be memory mapped at that offset,
+#   float32 for the array backend and float64 for the dict backend so resumed runs match exactly
+CHECKPOINT_MAGIC = b'QLMAZE01'
+CHECKPOINT_ALIGN = 64
+
+# Q table of either backend as a (rows, cols, 4) array
+def q_table_array(q_learning: Qlearning, dtype: str) -> np.ndarray:
+    if isinstance(q_learning, ArrayQlearning):
+        return q_learning.q_table.astype(dtype)
+    return np.array([[q_learning.q_table[(row, col)] for col in range(MAZE_SIZE[1])] for row in range(MAZE_SIZE[0])], dtype=dtype)
+
+# save maze, Q table, training progress, best run stats and rng state
+def save_checkpoint(path: str, maze: Maze, q_learning: Qlearning, first_finish_episode: int = None, minium_move_spent: int = None):
+    q_table = q_table_array(q_learning, '<f4' if isinstance(q_learning, ArrayQlearning) else '<f8')
+    version, internal_state, gauss_next = random.getstate()
+    metadata = json.dumps({
+        'seed': maze.seed,
+        'algorithm': maze.algorithm,
+        'maze_size': list(MAZE_SIZE),
+        'learner': type(q_learning).__name__,
+        'q_table_backend': 'array' if isinstance(q_learning, ArrayQlearning) else 'dict',
+        'q_table_dtype': q_table.dtype.str,
+        'episodes': q_learning.episodes,
+        'current_episode': q_learning.current_episode,
+        'epsilon': q_learning.epsilon,
+        'epsilon_decay': q_learning.epsilon_decay,
+        'learning_rate': q_learning.learing_rate,
+        'discount_factor': q_learning.discount_factor,
+        'first_success': first_finish_episode,
+        'fastest': minium_move_spent,
+        'random_state': [version, list(internal_state), gauss_next],
+    }).encode()
+    header_length = len(CHECKPOINT_MAGIC) + 4 + len(metadata)
+    padding = -header_length % CHECKPOINT_ALIGN
+
+    # write to a temporary file first so an interrupted save keeps the old checkpoint
+    with open(path + '.tmp', 'wb') as file:
+        file.write(CHECKPOINT_MAGIC)
+        file.write(len(metadata).to_bytes(4, 'little'))
+        file.write(metadata)
+        file.write(bytes(padding))
+        file.write(np.ascontiguousarray(q_table).tobytes())
+    os.replace(path + '.tmp', path)
+
+# read checkpoint metadata and the byte offset of the Q table
+def read_checkpoint_header(path: str) -> tuple[dict, int]:
+    with open(path, 'rb') as file:
+        if file.read(len(CHECKPOINT_MAGIC)) != CHECKPOINT_MAGIC:
+            raise ValueError(f'{path} is not a maze checkpoint')
+        metadata_length = int.from_bytes(file.read(4), 'little')
+        metadata = json.loads(file.read(metadata_length))
+    header_length = len(CHECKPOINT_MAGIC) + 4 + metadata_length
+    return metadata, header_length + (-header_length % CHECKPOINT_ALIGN)
+
+# memory map the Q table of a checkpoint without reading the whole file
+def open_checkpoint_q_table(path: str) -> tuple[dict, np.memmap]:
+    metadata, offset = read_checkpoint_header(path)
+    rows, cols = metadata['maze_size']
+    return metadata, np.memmap(path, dtype=metadata['q_table_dtype'], mode='r', offset=offset, shape=(rows, cols, 4))
+
+# restore maze, Q learning and best run stats (first success, fastest) of a checkpoint
+def load_checkpoint(path: str) -> tuple[Maze, Qlearning, int, int]:
+    metadata, q_table = open_checkpoint_q_table(path)
+    if tuple(metadata['maze_size']) != MAZE_SIZE:
+        raise ValueError(f'checkpoint maze size {tuple(metadata["maze_size"])} does not match {MAZE_SIZE}')
+
+    # only the Q table is saved, a learner with a planning model or replay buffer would resume without it
+    # checkpoints from before the learner was recorded only held plain Q learning
+    learner = metadata.get('learner', 'ArrayQlearning' if metadata['q_table_backend'] == 'array' else 'Qlearning')
+    if learner not in ['Qlearning', 'ArrayQlearning']:
+        raise ValueError(f'{path} was saved by {learner}, only Qlearning and ArrayQlearning checkpoints can be resumed')
+
+    maze = Maze(metadata['seed'], metadata['algorithm'])
+    q_learning = (ArrayQlearning if learner == 'ArrayQlearning' else Qlearning)(metadata['episodes'], metadata['epsilon_decay'], metadata['learning_rate'], metadata['discount_factor'])
+    if isinstance(q_learning, ArrayQlearning):
+        q_learning.q_table[:] = q_table
+    else:
+        for (row, col) in q_learning.q_table:
+            q_learning.q_table[(row, col)] = [float(q_value) for q_value in q_table[row, col]]
+    q_learning.epsilon = metadata['epsilon']
+    q_learning.current_episode = metadata['current_episode']
+
+    # restore the agent's rng so the run continues as if it was never stopped
+    version, internal_state, gauss_next = metadata['random_state']
+    random.setstate((version, tuple(internal_state), gauss_next))
+    return maze, q_learning, metadata['first_success'], metadata['fastest']
+
+# follow the greedy action from the start point, reads only the Q table rows it visits
+def greedy_rollout(maze: Maze, q_table: np.ndarray, max_moves: int = None) -> list[tuple[int, int]]:
+    max_moves = max_moves if max_moves != None else MOVE_PER_EPISODE
+    end_grid = (MAZE_SIZE[0] - 1, MAZE_SIZE[1] - 1)
+    path = [(0, 0)]
+    while path[-1] != end_grid and len(path) <= max_moves:
+        grid, _ = maze.next_grid(path[-1], int(np.argmax(q_table[path[-1]])))
+        path.append(grid)
+    return path
+
+# endregion checkpoint
+
+# region trajectory log
+# trajectory log layout, all little endian:
+#   8 bytes magic, uint32 metadata length, utf-8 json metadata (seed, algorithm, maze_size, snapshot_every),
+#   then records of a 1 byte tag, uint32 episode and a payload:
+#     b'S' float32 Q table (rows, cols, 4) in C order, taken before the episode
+#     b'E' uint32 move count, then one action byte per move
+#   every snapshot_every-th episode record of the log directly follows a snapshot record
+# <path>.index holds the uint64 offset of every episode record, so any episode is found without a scan,
+# it is rebuilt from the log when missing
+TRAJECTORY_MAGIC = b'QLTRAJ01'
+
+# read trajectory log metadata and the byte offset of the first record
+def read_trajectory_header(path: str) -> tuple[dict, int]:
+    with open(path, 'rb') as file:
+        if file.read(len(TRAJECTORY_MAGIC)) != TRAJECTORY_MAGIC:
+            raise ValueError(f'{path} is not a trajectory log')
+        metadata_length = int.from_bytes(file.read(4), 'little')
+        metadata = json.loads(file.read(metadata_length))
+    return metadata, len(TRAJECTORY_MAGIC) + 4 + metadata_length
+
+# scan the log once and write its index, return (episode record offsets, end of the last complete record)
+def build_trajectory_index(path: str) -> tuple[np.ndarray, int]:
+    metadata, offset = read_trajectory_header(path)
+    snapshot_length = metadata['maze_size'][0] * metadata['maze_size'][1] * 4 * 4
+    file_size = os.path.getsize(path)
+    offsets = []
+    with open(path, 'rb') as file:
+        file.seek(offset)
+        while True:
+            head = file.read(9)
+            if len(head) < 5:
+                break
+            if head[:1] == b'S':
+                record_length = 5 + snapshot_length
+            elif len(head) == 9:
+                record_length = 9 + int.from_bytes(head[5:9], 'little')
+            else:
+                break
+            # a record cut short by an interrupted run ends the log
+            if offset + record_length > file_size:
+                break
+            if head[:1] == b'E':
+                offsets.append(offset)
+            offset += record_length
+            file.seek(offset)
+    offsets = np.array(offsets, dtype='<u8')
+    with open(path + '.index', 'wb') as file:
+        file.write(offsets.tobytes())
+    return offsets, offset
+
+# append episodes and periodic Q table snapshots of a training run to a trajectory log
+# an existing log of the same maze is continued, so resumed runs extend it
+class TrajectoryWriter():
+    def __init__(self, path: str, maze: Maze, snapshot_every: int = 10):
+        if os.path.exists(path):
+            metadata, _ = read_trajectory_header(path)
+            if (metadata['seed'], metadata['algorithm'], tuple(metadata['maze_size'])) != (maze.seed, maze.algorithm, MAZE_SIZE):
+                raise ValueError(f'{path} is a trajectory log of another maze')
+            self.snapshot_every = metadata['snapshot_every']
+            # drop a record cut short by an interrupted run before appending
+            offsets, end = build_trajectory_index(path)
+            os.truncate(path, end)
+            self.episode_count = len(offsets)
+            self.file = open(path, 'ab')
+        else:
+            self.snapshot_every = snapshot_every
+            metadata = json.dumps({'seed': maze.seed, 'algorithm': maze.algorithm, 'maze_size': list(MAZE_SIZE), 'snapshot_every': snapshot_every}).encode()
+            self.episode_count = 0
+            self.file = open(path, 'wb')
+            self.file.write(TRAJECTORY_MAGIC)
+            self.file.write(len(metadata).to_bytes(4, 'little'))
+            self.file.write(metadata)
+            open(path + '.index', 'wb').close()
+        self.index_file = open(path + '.index', 'ab')
+
+    # snapshot the Q table before every snapshot_every-th episode of the log
+    def begin_episode(self, episode: int, q_learning: Qlearning):
+        if self.episode_count % self.snapshot_every == 0:
+            self.file.write(b'S' + episode.to_bytes(4, 'little'))
+            self.file.write(np.ascontiguousarray(q_table_array(q_learning, '<f4')).tobytes())
+
+    def end_episode(self, episode: int, actions: bytearray):
+        self.index_file.write(self.file.tell().to_bytes(8, 'little'))
+        self.file.write(b'E' + episode.to_bytes(4, 'little') + len(actions).to_bytes(4, 'little'))
+        self.file.write(actions)
+        self.episode_count += 1
+
+    def close(self):
+        self.file.close()
+        self.index_file.close()
+
+# read only side of a trajectory log, the log and its index are memory mapped
+# so episodes and snapshots are read from disk when they are asked for
+class TrajectoryLog():
+    def __init__(self, path: str):
+        self.metadata, _ = read_trajectory_header(path)
+        self.rows, self.cols = self.metadata['maze_size']
+        self.snapshot_every = self.metadata['snapshot_every']
+        self.data = np.memmap(path, dtype=np.uint8, mode='r')
+        if not os.path.exists(path + '.index'):
+            build_trajectory_index(path)
+        # a run killed mid write can leave a partial offset at the end of the index
+        index_length = os.path.getsize(path + '.index') // 8
+        if index_length > 0:
+            self.offsets = np.memmap(path + '.index', dtype='<u8', mode='r', shape=(index_length,))
+        else:
+            self.offsets = np.zeros(0, dtype='<u8')
+        # the index can run ahead of the log, keep the episodes whose record head is in the log
+        # (offsets are increasing) and drop the last one too if its actions were cut short
+        self.length = int(np.searchsorted(self.offsets, max(len(self.data) - 9, 0), side='right'))
+        if self.length > 0 and int(self.offsets[self.length - 1]) + 9 + self.move_count(self.length - 1) > len(self.data):
+            self.length -= 1
+
+    def __len__(self) -> int:
+        return self.length
+
+    def uint32(self, offset: int) -> int:
+        return int.from_bytes(self.data[offset:offset + 4].tobytes(), 'little')
+
+    # training episode number of the idx-th episode in the log
+    def episode(self, idx: int) -> int:
+        return self.uint32(int(self.offsets[idx]) + 1)
+
+    def move_count(self, idx: int) -> int:
+        return self.uint32(int(self.offsets[idx]) + 5)
+
+    # action bytes of an episode
+    def actions(self, idx: int) -> np.ndarray:
+        offset = int(self.offsets[idx]) + 9
+        return self.data[offset:offset + self.move_count(idx)]
+
+    # (training episode, Q table) of the latest snapshot taken at or before an episode
+    def snapshot(self, idx: int) -> tuple[int, np.ndarray]:
+        snapshot_length = self.rows * self.cols * 4 * 4
+        offset = int(self.offsets[idx - idx % self.snapshot_every]) - snapshot_length - 5
+        return self.uint32(offset + 1), self.data[offset + 5:offset + 5 + snapshot_length].view('<f4').reshape(self.rows, self.cols, 4)
+
+# endregion trajectory log
+
+# region profiling
+# per phase timers and counters of the step loop, every call returns right away when disabled
+# output ending with .json is written as a chrome trace (chrome://tracing, perfetto), else as jsonl
+# with one line of per phase stats every export_every seconds
+class Profiler():
+    def __init__(self, enabled: bool = False, output: str = None, export_every: float = 10.0):
+        self.enabled = enabled
+        self.output = output if enabled else None
+        self.export_every = export_every
+        self.trace = self.output != None and self.output.endswith('.json')
+        self.steps = 0
+        self.totals = dict()
+        self.counts = dict()
+        self.events = []
+        self.start_time = time.perf_counter()
+        self.export_snapshot = self.snapshot()
+        self.readout_snapshot = self.export_snapshot
+        self.file = None
+        if self.output != None:
+            self.file = open(self.output, 'w')
+            if self.trace:
+                # the trace array is left open, trace viewers accept that
+                self.file.write('[\n')
+
+    def start(self) -> float:
+        return time.perf_counter() if self.enabled else 0
+
+    # add the time since start to a phase, return the time to start the next phase from
+    def lap(self, phase: str, start: float) -> float:
+        if not self.enabled:
+            return 0
+        now = time.perf_counter()
+        self.totals[phase] = self.totals.get(phase, 0) + now - start
+        self.counts[phase] = self.counts.get(phase, 0) + 1
+        if self.trace:
+            self.events.append((phase, start, now))
+        return now
+
+    def end_step(self):
+        if not self.enabled:
+            return
+        self.steps += 1
+        if self.file != None and (time.perf_counter() - self.export_snapshot[0] >= self.export_every or len(self.events) >= PROFILE_TRACE_BUFFER_SIZE):
+            self.export()
+
+    def snapshot(self) -> tuple[float, int, dict, dict]:
+        return time.perf_counter(), self.steps, dict(self.totals), dict(self.counts)
+
+    # steps/sec and per phase stats since a snapshot
+    def stats_since(self, snapshot: tuple[float, int, dict, dict]) -> dict:
+        snapshot_time, snapshot_steps, snapshot_totals, snapshot_counts = snapshot
+        seconds = time.perf_counter() - snapshot_time
+        phases = dict()
+        for phase, total in self.totals.items():
+            count = self.counts[phase] - snapshot_counts.get(phase, 0)
+            total_ms = (total - snapshot_totals.get(phase, 0)) * 1000
+            phases[phase] = {'count': count, 'total_ms': total_ms, 'mean_ms': total_ms / count if count > 0 else 0}
+        return {'seconds': seconds, 'steps': self.steps - snapshot_steps, 'steps_per_sec': (self.steps - snapshot_steps) / seconds if seconds > 0 else 0, 'phases': phases}
+
+    def readout_due(self) -> bool:
+        return self.enabled and time.perf_counter() - self.readout_snapshot[0] >= PROFILE_READOUT_INTERVAL
+
+    # panel lines with steps/sec and mean ms per phase since the last readout
+    def readout(self) -> list[str]:
+        stats = self.stats_since(self.readout_snapshot)
+        self.readout_snapshot = self.snapshot()
+        lines = [f'steps/sec: {stats["steps_per_sec"]:.1f}']
+        for phase, phase_stats in stats['phases'].items():
+            lines.append(f'{phase}: {phase_stats["mean_ms"]:.3f} ms')
+        return lines
+
+    # write stats or trace events collected since the last export
+    def export(self):
+        if self.trace:
+            for phase, start, end in self.events:
+                self.file.write(json.dumps({'name': phase, 'ph': 'X', 'pid': os.getpid(), 'tid': 0, 'ts': (start - self.start_time) * 1e6, 'dur': (end - start) * 1e6}) + ',\n')
+            self.events.clear()
+        else:
+            stats = self.stats_since(self.export_snapshot)
+            stats['time'] = time.time()
+            stats['total_steps'] = self.steps
+            self.file.write(json.dumps(stats) + '\n')
+        self.file.flush()
+        self.export_snapshot = self.snapshot()
+
+    def close(self):
+        if self.file != None:
+            self.export()
+            self.file.close()
+            self.file = None
+
+# endregion profiling
+
+# region background training
+# Q table and game state shared between the training worker process and the window
+# the worker writes and the window copies under the same lock, so a snapshot is never half written
+class SharedTrainingState():
+    FIELDS = ['episode', 'move_left', 'epsilon', 'first_success', 'fastest', 'row', 'col', 'action', 'steps']
+
+    def __init__(self, coin_count: int, context):
+        self.lock = context.Lock()
+        self.q_values = context.RawArray('f', MAZE_SIZE[0] * MAZE_SIZE[1] * 4)
+        # fields above, then 1 for every collected coin, -1 stands for None
+        # starts as the first episode so the window has something to draw before the worker publishes
+        self.values = context.RawArray('d', [1, MOVE_PER_EPISODE, 1, -1, -1, 0, 0, 2, 0] + [0] * coin_count)
+
+    def arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        return np.frombuffer(self.q_values, dtype=np.float32).reshape(MAZE_SIZE[0], MAZE_SIZE[1], 4), np.frombuffer(self.values, dtype=np.float64)
+
+    def publish(self, q_learning: ArrayQlearning, env: MazeEnv, values: list, publish_q_values: bool):
+        q_table, shared_values = self.arrays()
+        collected = [not env.coins >> idx & 1 for idx in range(len(env.maze.coin_grids))]
+        with self.lock:
+            if publish_q_values:
+                q_table[:] = q_learning.q_table
+            shared_values[:] = values + collected
+
+    # copy of (Q table, fields as a dict, collected flag of every coin)
+    def read(self) -> tuple[np.ndarray, dict, list[bool]]:
+        q_table, shared_values = self.arrays()
+        with self.lock:
+            q_table = q_table.copy()
+            shared_values = shared_values.tolist()
+        fields = {name: (value if value != -1 else None) for name, value in zip(self.FIELDS, shared_values)}
+        return q_table, fields, [value == 1 for value in shared_values[len(self.FIELDS):]]
+
+# train in a worker process and publish a snapshot every BACKGROUND_PUBLISH_INTERVAL
+# commands: ('speed', steps per second or None), ('q_values', publish the Q table or not), ('stop',)
+def training_worker(seed: int, algorithm: str, maze_size: tuple[int, int], shared: SharedTrainingState, commands):
+    set_maze_size(*maze_size)
+    maze = Maze(seed, algorithm)
+    q_learning = ArrayQlearning(0)
+    env = MazeEnv(maze)
+    steps_per_second = BACKGROUND_SPEEDS[2]
+    publish_q_values = True
+    first_finish_episode = None
+    minium_move_spent = None
+    total_steps = 0
+    action = 2
+    throttle_start, throttle_steps = time.perf_counter(), 0
+    next_publish = 0
+
+    state = env.reset()
+    while True:
+        action = q_learning.choose_action(state)
+        next_state, reward, finished, done = env.step(action)
+        q_learning.update_q_value(state, next_state, action, reward)
+        state = next_state
+        total_steps += 1
+        if done:
+            if finished:
+                if first_finish_episode == None:
+                    first_finish_episode = q_learning.current_episode
+                minium_move_spent = min(minium_move_spent or MOVE_PER_EPISODE, MOVE_PER_EPISODE - env.move_left)
+            q_learning.end_episode()
+            state = env.reset()
+
+        # sleep off the time a throttled run is ahead of its speed
+        if steps_per_second != None:
+            throttle_steps += 1
+            delay = throttle_start + throttle_steps / steps_per_second - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        elif total_steps % 256 != 0:
+            continue
+
+        if time.perf_counter() < next_publish:
+            continue
+        next_publish = time.perf_counter() + BACKGROUND_PUBLISH_INTERVAL
+        # stop with the window even if it was killed before sending stop
+        if not multiprocessing.parent_process().is_alive():
+            return
+        while not commands.empty():
+            command = commands.get()
+            if command[0] == 'stop':
+                return
+            elif command[0] == 'speed':
+                steps_per_second = command[1]
+                throttle_start, throttle_steps = time.perf_counter(), 0
+            elif command[0] == 'q_values':
+                publish_q_values = command[1]
+        values = [q_learning.current_episode, env.move_left, q_learning.epsilon, first_finish_episode or -1, minium_move_spent or -1, env.pos[0], env.pos[1], action, total_steps]
+        shared.publish(q_learning, env, values, publish_q_values)
+
+# endregion background training
+
+# region frame export
+# red, green and blue (height, width) uint8 planes of a raw window buffer
+# layout is (width, height, pitch, shifts) of the 32 bit window surface
+def frame_channels(frame: bytes, layout: tuple) -> list[np.ndarray]:
+    width, height, pitch, shifts = layout
+    pixels = np.frombuffer(frame, dtype=np.uint32).reshape(height, pitch // 4)[:, :width]
+    return [(pixels >> shift).astype(np.uint8) for shift in shifts[:3]]
+
+# write (index, raw window buffer) frames from the queue until None
+# output ending in .y4m is a YUV4MPEG2 video (plays in ffplay / mpv / vlc), .rgb raw rgb24 frames, anything else a directory of PNGs
+# PNGs are one file per frame, so several writers can share the queue
+def frame_writer(output: str, layout: tuple, fps: int, frames):
+    width, height = layout[:2]
+    extension = os.path.splitext(output)[1]
+    if extension == '.y4m':
+        file = open(output, 'wb')
+        file.write(f'YUV4MPEG2 W{width} H{height} F{fps}:1 Ip A1:1 C444\n'.encode())
+    elif extension == '.rgb':
+        file = open(output, 'wb')
+    else:
+        os.makedirs(output, exist_ok=True)
+        load_pygame()
+
+    while True:
+        item = frames.get()
+        if item == None:
+            break
+        idx, frame = item
+        if extension == '.y4m':
+            # BT.601 studio range in 8 bit fixed point
+            r, g, b = [channel.astype(np.int32) for channel in frame_channels(frame, layout)]
+            file.write(b'FRAME\n')
+            file.write(((66 * r + 129 * g + 25 * b + 128 >> 8) + 16).astype(np.uint8).tobytes())
+            file.write(((-38 * r - 74 * g + 112 * b + 128 >> 8) + 128).astype(np.uint8).tobytes())
+            file.write(((112 * r - 94 * g - 18 * b + 128 >> 8) + 128).astype(np.uint8).tobytes())
+        elif extension == '.rgb':
+            file.write(np.stack(frame_channels(frame, layout), axis=-1).tobytes())
+        else:
+            pygame.image.save(pygame.image.frombytes(np.stack(frame_channels(frame, layout), axis=-1).tobytes(), (width, height), 'RGB'), os.path.join(output, f'frame_{idx:06d}.png'))
+    if extension in ['.y4m', '.rgb']:
+        file.close()
+
+# put an item on the frame queue, a writer that died stops taking frames and would block a full queue
+# forever, so wait EXPORT_PUT_TIMEOUT at a time and raise once a writer is gone
+def put_frame(frames, item, writers: list):
+    while True:
+        try:
+            frames.put(item, timeout=EXPORT_PUT_TIMEOUT)
+            return
+        except queue.Full:
+            dead = [writer for writer in writers if not writer.is_alive()]
+            if len(dead) > 0:
+                raise RuntimeError(f'frame writer exited with code {dead[0].exitcode}')
+
+# train without a display and render a frame of the window every frame_every moves,
+# frames go through a bounded queue to a writer process so rendering and encoding overlap
+def export_training(output: str, episodes: int, seed: int = None, algorithm: str = 'dfs', frame_every: int = 1, fps: int = EXPORT_FPS, display_q_values: bool = True, q_table: str = 'dict') -> dict:
+    init_display(offscreen=True)
+    maze = Maze(seed, algorithm)
+    # seed exploration with the maze seed so a run repeats
+    random.seed(maze.seed)
+    q_learning = (ArrayQlearning if q_table == 'array' else Qlearning)(episodes)
+    env = MazeEnv(maze)
+    player = Player()
+    camera = Camera()
+    first_finish_episode = None
+    minium_move_spent = None
+
+    # init panel
+    panel = Panel()
+    panel.init_panel()
+    panel.show_hide_q_values_buttons.buttons[0].select = display_q_values
+    panel.show_hide_q_values_buttons.buttons[1].select = not display_q_values
+
+    # spawned so writers do not inherit the pygame state, a video needs its frames in order so it gets one writer
+    # frames are sent as the raw window buffer, converting them to rgb is left to the writers
+    context = multiprocessing.get_context('spawn')
+    frames = context.Queue(EXPORT_QUEUE_SIZE)
+    layout = (WIN.get_width(), WIN.get_height(), WIN.get_pitch(), WIN.get_shifts())
+    writer_count = 1 if os.path.splitext(output)[1] in ['.y4m', '.rgb'] else EXPORT_PNG_WRITERS
+    writers = [context.Process(target=frame_writer, args=(output, layout, fps, frames)) for _ in range(writer_count)]
+    # whatever stops the export, writers left running or frames still buffered for the pipe
+    # would keep this process from exiting
+    exported = False
+    try:
+        for writer in writers:
+            writer.start()
+
+        total_steps = 0
+        frame_count = 0
+        start_time = time.perf_counter()
+        while q_learning.current_episode <= episodes:
+            state = env.reset()
+            full_redraw = True
+            dirty_grids = set()
+            done = False
+            while not done:
+                action = q_learning.choose_action(state)
+                next_state, reward, finished, done = env.step(action)
+                q_learning.update_q_value(state, next_state, action, reward)
+                dirty_grids.update([state, next_state])
+                state = next_state
+                total_steps += 1
+                if finished:
+                    if first_finish_episode == None:
+                        first_finish_episode = q_learning.current_episode
+                    minium_move_spent = min(minium_move_spent or MOVE_PER_EPISODE, MOVE_PER_EPISODE - env.move_left)
+                if total_steps % frame_every != 0:
+                    continue
+
+                # move the sprite and coins to the env state
+                place_player(player, env.pos, action)
+                coins = env.coins
+
+                # update panel text, render only the changed lines
+                dirty_texts = panel.set_info_lines(training_info_lines(q_learning.current_episode, env.move_left, q_learning.epsilon, first_finish_episode, minium_move_spent))
+
+                # the window surface keeps the last frame, so only what changed since it needs drawing
+                if full_redraw or camera.follow or not camera.is_identity():
+                    draw_view(maze, coins, player, q_learning, panel, display_q_values, camera)
+                    full_redraw = False
+                else:
+                    update_window(maze, coins, player, q_learning, panel, display_q_values, dirty_grids | q_value_overlay.take_updated_grids(q_learning), dirty_texts)
+                dirty_grids.clear()
+                put_frame(frames, (frame_count, WIN.get_buffer().raw), writers)
+                frame_count += 1
+            q_learning.end_episode()
+        render_seconds = time.perf_counter() - start_time
+
+        for writer in writers:
+            put_frame(frames, None, writers)
+        for writer in writers:
+            writer.join()
+        elapsed = time.perf_counter() - start_time
+        # a writer can die without the queue filling up, a PNG writer while the others keep it moving
+        for writer in writers:
+            if writer.exitcode != 0:
+                raise RuntimeError(f'frame writer exited with code {writer.exitcode}')
+        exported = True
+    finally:
+        if not exported:
+            for writer in writers:
+                if writer.is_alive():
+                    writer.terminate()
+            frames.cancel_join_thread()
+        pygame.quit()
+
+    return {
+        'seed': maze.seed,
+        'episodes': episodes,
+        'steps': total_steps,
+        'frames': frame_count,
+        'seconds': elapsed,
+        'render_seconds': render_seconds,
+        'frames_per_sec': frame_count / elapsed if elapsed > 0 else float('inf'),
+        'first_success': first_finish_episode,
+        'fastest': minium_move_spent,
+    }
+
+# endregion frame export
+
 # region main
 # main function
-def main():
+# with a checkpoint, resume from it if it exists and save to it when the window closes, else play a new maze of seed and algorithm
+def main(checkpoint: str = None, profiler: Profiler = None, seed: int = None, algorithm: str = 'dfs'):
+    init_display()
     clock = pygame.time.Clock()
     run = True
+    profiler = profiler if profiler != None else Profiler()
 
-    # init game
-    maze = Maze()
-    coins = maze.all_coins.copy()
+    # init game and training
+    if checkpoint != None and os.path.exists(checkpoint):
+        maze, q_learning, first_finish_episode, minium_move_spent = load_checkpoint(checkpoint)
+        minium_move_spent = minium_move_spent if minium_move_spent != None else 1e9
+    else:
+        maze = Maze(seed, algorithm)
+        q_learning = Qlearning(100)
+        first_finish_episode = None
+        minium_move_spent = 1e9
+    print(f'seed = {maze.seed}')
+    coins = maze.all_coins_mask
     player = Player()
-
-    # init training
+    camera = Camera()
     frame_per_move = 10
     move_clock = frame_per_move
     move_left = MOVE_PER_EPISODE
-    q_learning = Qlearning(100)
-    first_finish_episode = None
-    minium_move_spent = 1e9
 
     # init panel
     panel = Panel()
-    font = pygame.font.SysFont(FONT, FONT_SIZE)
-    panel.texts.append(font.render(f'episode num: {q_learning.current_episode}', True, TEXT_COLOR))
-    panel.texts.append(font.render(f'move left: {move_left}', True, TEXT_COLOR))
-    panel.texts.append(font.render(f'epsilon: {q_learning.epsilon}', True, TEXT_COLOR))
-    panel.texts.append(font.render(f'first success: {first_finish_episode if first_finish_episode != None else " "}', True, TEXT_COLOR))
-    panel.texts.append(font.render(f'fastest: {minium_move_spent if minium_move_spent != 1e9 else " "} moves', True, TEXT_COLOR))
     panel.init_panel()
-    
+    panel.set_info_lines(training_info_lines(q_learning.current_episode, move_left, q_learning.epsilon, first_finish_episode, minium_move_spent if minium_move_spent != 1e9 else None))
+    full_redraw = True
+
     # init control settings
     show_q_values = True
     speed = 2 # 0->1,60 1->2,30 2->3,10 3->4,5 4->5,1
@@ -462,11 +2312,16 @@ def main():
                 button_clicked = panel.show_hide_q_values_buttons.select(event.pos)
                 if button_clicked != None:
                     show_q_values = True if show_q_values == 0 else False
+                    full_redraw = True
                 # check is speed buttons is clicked
                 button_clicked = panel.speed_buttons.select(event.pos)
                 if button_clicked != None:
                     speed = button_clicked
                     frame_per_move = speed_dict[speed]
+                    full_redraw = True
+            # zoom, pan or follow with the camera and show it right away
+            if camera.handle_event(event):
+                draw_view(maze, coins, player, q_learning, panel, show_q_values, camera)
             # region keyboard control
             # if event.type == pygame.KEYDOWN:
             #     # update player pos from input
@@ -483,10 +2338,13 @@ def main():
         # make action and update q table
         if move_clock == 0:
             # choose action and move
+            lap_time = profiler.start()
             player_pos_before = player.pos
             action = q_learning.choose_action(player.pos)
+            lap_time = profiler.lap('choose_action', lap_time)
             moved = move_player(maze, player, action)
             move_left -= 1
+            lap_time = profiler.lap('move_player', lap_time)
 
             # calculate reward
             reward = 0
@@ -498,44 +2356,350 @@ def main():
                 if first_finish_episode == None:
                     first_finish_episode = q_learning.current_episode
                 minium_move_spent = min(minium_move_spent, MOVE_PER_EPISODE - move_left)
-            for coin in coins:
-                if player.rect.colliderect(coin):
-                    reward += 5
-                    coins.remove(coin)
+            coins, collected = maze.collect_coin(coins, player.pos)
+            if collected:
+                reward += 5
             if player.pos == player.last_last_pos:
                 reward -= 1
 
             # update player pos history
             player.last_last_pos = player.last_pos
             player.last_pos = player.pos
+            lap_time = profiler.lap('collisions', lap_time)
 
             # update Q table
             q_learning.update_q_value(player_pos_before, player.pos, action, reward)
+            lap_time = profiler.lap('update_q_value', lap_time)
 
-            # update panel text
-            panel.texts[0] = font.render(f'episode num: {q_learning.current_episode}', True, TEXT_COLOR)
-            panel.texts[1] = font.render(f'move left: {move_left}', True, TEXT_COLOR)
-            panel.texts[2] = font.render(f'epsilon: {q_learning.epsilon:.6f}', True, TEXT_COLOR)
-            panel.texts[3] = font.render(f'first success: {first_finish_episode if first_finish_episode != None else " "}', True, TEXT_COLOR)
-            panel.texts[4] = font.render(f'fastest: {minium_move_spent if minium_move_spent != 1e9 else " "} moves', True, TEXT_COLOR)
+            # update panel text, render only the changed lines
+            dirty_texts = panel.set_info_lines(training_info_lines(q_learning.current_episode, move_left, q_learning.epsilon, first_finish_episode, minium_move_spent if minium_move_spent != 1e9 else None))
+            lap_time = profiler.lap('panel_text', lap_time)
 
             # end episode if finish or out of moves
             if move_left == 0 or player.rect.colliderect(maze.end_point):
                 q_learning.end_episode()
                 player = reset_game(player)
-                coins = maze.all_coins.copy()
+                coins = maze.all_coins_mask
                 move_left = MOVE_PER_EPISODE
+                full_redraw = True
 
             # reset move clock
             move_clock = frame_per_move
 
-            draw_window(maze, coins, player, q_learning, panel, show_q_values)
+            # redraw everything after a reset, a button click or through the camera, else only what the move changed
+            if full_redraw or camera.follow or not camera.is_identity():
+                draw_view(maze, coins, player, q_learning, panel, show_q_values, camera)
+                full_redraw = False
+            else:
+                dirty_grids = {player_pos_before, player.pos} | q_value_overlay.take_updated_grids(q_learning)
+                update_window(maze, coins, player, q_learning, panel, show_q_values, dirty_grids, dirty_texts)
+            profiler.lap('draw_window', lap_time)
+            profiler.end_step()
+
+        # refresh the profile readout a few times per second
+        if profiler.readout_due():
+            panel.set_profile_lines(profiler.readout())
+            panel.draw_profile()
         
         move_clock -= 1
 
+    if checkpoint != None:
+        save_checkpoint(checkpoint, maze, q_learning, first_finish_episode, minium_move_spent if minium_move_spent != 1e9 else None)
+    profiler.close()
+    pygame.quit()
+
+# position in a trajectory log, replays the moves of an episode on the player and coins
+class TrajectoryCursor():
+    def __init__(self, log: TrajectoryLog, maze: Maze, player: Player):
+        self.log = log
+        self.maze = maze
+        self.player = player
+        self.seek(0, 0)
+
+    # jump to a move of an episode, replaying the episode from the start point
+    def seek(self, idx: int, move: int):
+        self.idx = min(max(idx, 0), len(self.log) - 1)
+        self.actions = self.log.actions(self.idx)
+        self.move = 0
+        self.player = reset_game(self.player)
+        self.player.direction = "d"
+        self.coins = self.maze.all_coins_mask
+        self.replay(min(max(move, 0), len(self.actions)))
+
+    def replay(self, move: int):
+        for action in self.actions[self.move:move].tolist():
+            move_player(self.maze, self.player, action)
+            self.coins = self.maze.collect_coin(self.coins, self.player.pos)[0]
+        self.move = move
+
+    # play moves forward, the start of the next episode counts as one move
+    # whole episodes in between are skipped without replaying, return False at the end of the log
+    def advance(self, moves: int) -> bool:
+        idx, move = self.idx, self.move + moves
+        while move > self.log.move_count(idx) and idx < len(self.log) - 1:
+            move -= self.log.move_count(idx) + 1
+            idx += 1
+        if idx == self.idx:
+            self.replay(min(move, len(self.actions)))
+        else:
+            self.seek(idx, move)
+        return self.idx < len(self.log) - 1 or self.move < len(self.actions)
+
+# window at display rate while a worker process trains, drawing the latest snapshot it published
+# panel buttons are sent to the worker as commands
+def main_background(seed: int = None, algorithm: str = 'dfs'):
+    init_display()
+    clock = pygame.time.Clock()
+    run = True
+
+    # init game and start the worker, spawned so it never inherits the window
+    maze = Maze(seed, algorithm)
+    print(f'seed = {maze.seed}')
+    context = multiprocessing.get_context('spawn')
+    shared = SharedTrainingState(len(maze.coin_grids), context)
+    commands = context.Queue()
+    worker = context.Process(target=training_worker, args=(maze.seed, maze.algorithm, MAZE_SIZE, shared, commands), daemon=True)
+    worker.start()
+    q_learning = ArrayQlearning(0)
+    player = Player()
+    camera = Camera()
+
+    # init panel
+    panel = Panel(6)
+    panel.init_panel()
+    last_steps, last_time, steps_per_sec = 0, time.perf_counter(), 0
+
+    # init control settings
+    show_q_values = True
+
+    # game loop
+    while run:
+        clock.tick(FPS)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                run = False
+
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                # check is show/hide q value button is clicked
+                button_clicked = panel.show_hide_q_values_buttons.select(event.pos)
+                if button_clicked != None:
+                    show_q_values = button_clicked == 0
+                    commands.put(('q_values', show_q_values))
+                # check is speed buttons is clicked
+                button_clicked = panel.speed_buttons.select(event.pos)
+                if button_clicked != None:
+                    commands.put(('speed', BACKGROUND_SPEEDS[button_clicked]))
+            camera.handle_event(event)
+
+        # latest snapshot of the worker
+        q_table, fields, collected = shared.read()
+        q_learning.q_table[:] = q_table
+        place_player(player, (int(fields['row']), int(fields['col'])), int(fields['action']))
+        coins = sum(1 << idx for idx, is_collected in enumerate(collected) if not is_collected)
+
+        # training speed over the last half second
+        if time.perf_counter() - last_time >= 0.5:
+            steps_per_sec = (fields['steps'] - last_steps) / (time.perf_counter() - last_time)
+            last_steps, last_time = fields['steps'], time.perf_counter()
+
+        # update panel text, render only the changed lines
+        first_success = int(fields['first_success']) if fields['first_success'] != None else None
+        fastest = int(fields['fastest']) if fields['fastest'] != None else None
+        panel.set_info_lines(training_info_lines(int(fields['episode']), int(fields['move_left']), fields['epsilon'], first_success, fastest) + [f'steps/sec: {steps_per_sec:.0f}'])
+
+        draw_view(maze, coins, player, q_learning, panel, show_q_values, camera)
+
+    commands.put(('stop',))
+    worker.join(5)
+    if worker.is_alive():
+        worker.terminate()
+    pygame.quit()
+
+# replay a trajectory log written by headless training in the game window
+# space pauses, left / right step one move, up / down one episode, page up / down snapshot_every episodes,
+# + / - double or halve the speed, click or drag the bar at the bottom of the panel to seek
+def view_trajectory(path: str):
+    # init log and game, the maze size comes from the log
+    log = TrajectoryLog(path)
+    if len(log) == 0:
+        raise ValueError(f'{path} has no episodes')
+    set_maze_size(log.rows, log.cols)
+    init_display()
+    clock = pygame.time.Clock()
+    run = True
+    maze = Maze(log.metadata['seed'], log.metadata['algorithm'])
+    print(f'seed = {maze.seed}')
+    cursor = TrajectoryCursor(log, maze, Player())
+    camera = Camera()
+    q_learning = ArrayQlearning(0)
+    snapshot_episode = None
+
+    # init panel
+    panel = Panel()
+    panel.init_panel()
+    bar_rect = pygame.Rect(GAME_WIN_WIDTH + 30, WIN_HEIGHT - 40, WIN_WIDTH - GAME_WIN_WIDTH - 60, 16)
+    dragging = False
+
+    # init control settings
+    show_q_values = True
+    paused = False
+    speed_dict = {0:60, 1:30, 2:10, 3:5, 4:1}
+    moves_per_second = FPS / speed_dict[2]
+    move_budget = 0
+
+    # game loop
+    while run:
+        clock.tick(FPS)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                run = False
+
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                # check is show/hide q value button is clicked
+                button_clicked = panel.show_hide_q_values_buttons.select(event.pos)
+                if button_clicked != None:
+                    show_q_values = button_clicked == 0
+                # check is speed buttons is clicked
+                button_clicked = panel.speed_buttons.select(event.pos)
+                if button_clicked != None:
+                    moves_per_second = FPS / speed_dict[button_clicked]
+                dragging = bar_rect.collidepoint(event.pos)
+            if event.type == pygame.MOUSEBUTTONUP:
+                dragging = False
+            # seek to the episode under the mouse on the bar
+            if dragging and event.type in [pygame.MOUSEBUTTONDOWN, pygame.MOUSEMOTION]:
+                cursor.seek(int((event.pos[0] - bar_rect.x) / bar_rect.width * len(log)), 0)
+                move_budget = 0
+
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.key == pygame.K_RIGHT:
+                    paused = True
+                    cursor.advance(1)
+                elif event.key == pygame.K_LEFT:
+                    paused = True
+                    if cursor.move > 0:
+                        cursor.seek(cursor.idx, cursor.move - 1)
+                    elif cursor.idx > 0:
+                        cursor.seek(cursor.idx - 1, log.move_count(cursor.idx - 1))
+                elif event.key in [pygame.K_UP, pygame.K_DOWN, pygame.K_PAGEUP, pygame.K_PAGEDOWN]:
+                    step = 1 if event.key in [pygame.K_UP, pygame.K_DOWN] else log.snapshot_every
+                    cursor.seek(cursor.idx + (step if event.key in [pygame.K_DOWN, pygame.K_PAGEDOWN] else -step), 0)
+                elif event.key in [pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS]:
+                    moves_per_second *= 2
+                elif event.key in [pygame.K_MINUS, pygame.K_KP_MINUS]:
+                    moves_per_second /= 2
+            camera.handle_event(event)
+
+        # play the moves due this frame, stop at the end of the log
+        if not paused:
+            move_budget += moves_per_second / FPS
+            if move_budget >= 1:
+                paused = not cursor.advance(int(move_budget))
+                move_budget -= int(move_budget)
+
+        # show the latest Q table snapshot at or before the episode
+        episode, q_table = log.snapshot(cursor.idx)
+        if episode != snapshot_episode:
+            q_learning.q_table[:] = q_table
+            snapshot_episode = episode
+
+        # update panel text, render only the changed lines
+        panel.set_info_lines([
+            f'episode num: {log.episode(cursor.idx)}',
+            f'move: {cursor.move}/{len(cursor.actions)}',
+            f'speed: {moves_per_second:g} moves/s',
+            f'Q snapshot: {snapshot_episode}',
+            'paused' if paused else 'playing',
+        ])
+
+        draw_view(maze, cursor.coins, cursor.player, q_learning, panel, show_q_values, camera)
+        pygame.draw.rect(WIN, BUTTON_SELECTED_COLOR, bar_rect)
+        pygame.draw.rect(WIN, TEXT_COLOR, (bar_rect.x, bar_rect.y, bar_rect.width * (cursor.idx + 1) / len(log), bar_rect.height))
+        pygame.display.update(bar_rect)
+
     pygame.quit()
 
 # endregion main
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Q learning maze')
+    parser.add_argument('--headless', action='store_true', help='train without the game window')
+    parser.add_argument('--episodes', type=int, default=100, help='episodes to train in headless mode')
+    parser.add_argument('--seed', type=int, default=None, help='maze seed, random if not given')
+    parser.add_argument('--log-every', type=int, default=0, help='print progress every n episodes')
+    parser.add_argument('--size', type=int, nargs=2, default=None, metavar=('ROWS', 'COLS'), help='maze size, 5 5 if not given')
+    parser.add_argument('--maze-cache', default=None, help='load generated mazes from and save them to this directory')
+    parser.add_argument('--q-table', choices=['dict', 'array'], default='dict', help='Q table backend')
+    parser.add_argument('--algorithm', choices=list(MAZE_GENERATORS), default='dfs', help='maze generation algorithm')
+    parser.add_argument('--batch', type=int, default=0, help='train this many mazes (seeds from --seed up) in lockstep')
+    parser.add_argument('--planning', choices=['dyna', 'prioritized'], default=None, help='learn a model and plan on it in headless mode')
+    parser.add_argument('--planning-steps', type=int, default=10, help='simulated backups per real move')
+    parser.add_argument('--replay', choices=['uniform', 'prioritized'], default=None, help='replay minibatches from an experience replay buffer in headless mode')
+    parser.add_argument('--replay-batch', type=int, default=32, help='replayed transitions per real move')
+    parser.add_argument('--coin-state', action='store_true', help='learn on states of the position and the coins collected so far in headless mode, in a sparse Q table')
+    parser.add_argument('--early-stop', type=int, default=0, help='stop headless training once the greedy path is optimal and unchanged for this many episodes')
+    parser.add_argument('--tolerance', type=float, default=None, help='with --early-stop, also require the largest Q value change of an episode to be at most this')
+    parser.add_argument('--checkpoint', default=None, help='resume from this checkpoint if it exists and save to it when done')
+    parser.add_argument('--rollout', action='store_true', help='print the greedy path of the checkpoint and exit')
+    parser.add_argument('--background', action='store_true', help='train in a worker process while the window draws its snapshots')
+    parser.add_argument('--trajectory', default=None, help='log training to this trajectory log in headless mode, else replay it in the window')
+    parser.add_argument('--snapshot-every', type=int, default=10, help='episodes between Q table snapshots in the trajectory log')
+    parser.add_argument('--export', default=None, help='train offscreen and write a frame every --frame-every moves to this .y4m video, .rgb raw video or PNG directory')
+    parser.add_argument('--frame-every', type=int, default=1, help='moves between exported frames')
+    parser.add_argument('--export-fps', type=int, default=EXPORT_FPS, help='frame rate written to the exported video')
+    parser.add_argument('--hide-q-values', action='store_true', help='leave Q values out of exported frames')
+    parser.add_argument('--profile', action='store_true', help='time every phase of the step loop, shown in the panel')
+    parser.add_argument('--profile-output', default=None, help='export profile stats to a .jsonl file or a .json chrome trace')
+    parser.add_argument('--profile-every', type=float, default=10.0, help='seconds between profile exports')
+    args = parser.parse_args()
+    if args.rollout and args.checkpoint == None:
+        parser.error('--rollout needs --checkpoint')
+    if args.planning != None and (args.checkpoint != None or args.q_table == 'array'):
+        parser.error('--planning works with --q-table dict and without --checkpoint')
+    if args.replay != None and args.checkpoint != None:
+        parser.error('--replay works without --checkpoint')
+    if args.coin_state and (args.planning != None or args.replay != None or args.checkpoint != None or args.trajectory != None or args.early_stop > 0):
+        parser.error('--coin-state works without --planning, --replay, --checkpoint, --trajectory and --early-stop')
+    # through the environment so worker processes use the same cache
+    if args.maze_cache != None:
+        MAZE_CACHE_DIR = os.environ['MAZE_CACHE_DIR'] = args.maze_cache
+    # an existing checkpoint or trajectory log keeps the size it was trained with
+    if args.checkpoint != None and os.path.exists(args.checkpoint):
+        set_maze_size(*read_checkpoint_header(args.checkpoint)[0]['maze_size'])
+    elif args.trajectory != None and os.path.exists(args.trajectory):
+        set_maze_size(*read_trajectory_header(args.trajectory)[0]['maze_size'])
+    elif args.size != None:
+        set_maze_size(*args.size)
+    profiler = Profiler(args.profile or args.profile_output != None, args.profile_output, args.profile_every)
+
+    if args.rollout:
+        metadata, q_table = open_checkpoint_q_table(args.checkpoint)
+        path = greedy_rollout(Maze(metadata['seed'], metadata['algorithm']), q_table)
+        print(f'episode {metadata["current_episode"]}, greedy path {len(path) - 1} moves, {"reached" if path[-1] == (MAZE_SIZE[0] - 1, MAZE_SIZE[1] - 1) else "did not reach"} the end point')
+        print(path)
+    elif args.headless and args.batch > 0:
+        first_seed = args.seed if args.seed != None else random.randint(1, 65535)
+        stats = train_batch(args.episodes, list(range(first_seed, first_seed + args.batch)), args.algorithm)
+        solved = [episode for episode in stats['first_success'] if episode != None]
+        print(f'seeds: {first_seed} to {first_seed + args.batch - 1}, mazes: {args.batch}, episodes: {stats["episodes"]}, steps: {stats["steps"]}, time: {stats["seconds"]:.3f}s, {stats["steps_per_sec"]:.0f} steps/sec')
+        print(f'solved: {len(solved)}/{args.batch}, mean first success: {sum(solved) / len(solved) if len(solved) > 0 else " "}')
+    elif args.headless:
+        stats = train_headless(args.episodes, args.seed, args.log_every, args.q_table, args.algorithm, checkpoint=args.checkpoint, profiler=profiler, planning=args.planning, planning_steps=args.planning_steps, replay=args.replay, replay_batch=args.replay_batch, trajectory=args.trajectory, snapshot_every=args.snapshot_every, early_stop=args.early_stop, tolerance=args.tolerance, coin_state=args.coin_state)
+        print(f'seed: {stats["seed"]}, episodes: {stats["episodes"]}, steps: {stats["steps"]}, time: {stats["seconds"]:.3f}s, {stats["steps_per_sec"]:.0f} steps/sec')
+        print(f'first success: {stats["first_success"]}, fastest: {stats["fastest"]} moves')
+        if args.coin_state:
+            print(f'visited states: {len(stats["q_learning"].index)}, Q table: {stats["q_learning"].nbytes()} bytes')
+        if args.early_stop > 0:
+            print(f'converged: {stats["converged"] if stats["converged"] != None else "no"}')
+    elif args.export != None:
+        stats = export_training(args.export, args.episodes, args.seed, args.algorithm, args.frame_every, args.export_fps, not args.hide_q_values, args.q_table)
+        print(f'seed: {stats["seed"]}, episodes: {stats["episodes"]}, steps: {stats["steps"]}, frames: {stats["frames"]}, time: {stats["seconds"]:.3f}s (rendering {stats["render_seconds"]:.3f}s), {stats["frames_per_sec"]:.0f} frames/sec')
+        print(f'first success: {stats["first_success"]}, fastest: {stats["fastest"]} moves')
+    elif args.trajectory != None:
+        view_trajectory(args.trajectory)
+    elif args.background:
+        main_background(args.seed, args.algorithm)
+    else:
+        main(args.checkpoint, profiler, args.seed, args.algorithm)
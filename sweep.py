@@ -0,0 +1,127 @@
+# region import
+import os
+import csv
+import json
+import random
+import argparse
+import itertools
+import multiprocessing
+
+import maze
+# endregion import
+
+# region sweep
+CONFIG_KEYS = ['seed', 'algorithm', 'episodes', 'epsilon_decay', 'learning_rate', 'discount_factor']
+# early stop settings of a sweep, part of every config, rows written before they were columns ran without early stop
+STOP_KEYS = ['early_stop', 'tolerance']
+RESULT_KEYS = CONFIG_KEYS + STOP_KEYS + ['first_success', 'fastest', 'converged', 'seconds', 'steps', 'steps_per_sec']
+
+# identify a config no matter if it was read back from json or csv, csv writes a tolerance of None as ''
+def config_id(config: dict) -> tuple:
+    tolerance = config.get('tolerance')
+    return (int(config['seed']), config['algorithm'], int(config['episodes']), round(float(config['epsilon_decay']), 6), round(float(config['learning_rate']), 6), round(float(config['discount_factor']), 6),
+            int(config.get('early_stop') or 0), round(float(tolerance), 6) if tolerance not in [None, ''] else None)
+
+# every combination of the given values
+def grid_configs(seeds: list[int], algorithms: list[str], episodes: list[int], epsilon_decays: list[float], learning_rates: list[float], discount_factors: list[float]) -> list[dict]:
+    return [dict(zip(CONFIG_KEYS, values)) for values in itertools.product(seeds, algorithms, episodes, epsilon_decays, learning_rates, discount_factors)]
+
+# n random configs, float parameters uniform between the min and max given value
+def random_configs(n: int, sweep_seed: int, seeds: list[int], algorithms: list[str], episodes: list[int], epsilon_decays: list[float], learning_rates: list[float], discount_factors: list[float]) -> list[dict]:
+    rng = random.Random(sweep_seed)
+    configs = []
+    for _ in range(n):
+        configs.append({
+            'seed': rng.choice(seeds),
+            'algorithm': rng.choice(algorithms),
+            'episodes': rng.choice(episodes),
+            'epsilon_decay': round(rng.uniform(min(epsilon_decays), max(epsilon_decays)), 6),
+            'learning_rate': round(rng.uniform(min(learning_rates), max(learning_rates)), 6),
+            'discount_factor': round(rng.uniform(min(discount_factors), max(discount_factors)), 6),
+        })
+    return configs
+
+# ids of configs already in the output file
+def completed_configs(output: str) -> set[tuple]:
+    if not os.path.exists(output):
+        return set()
+    with open(output, newline='') as file:
+        if output.endswith('.csv'):
+            rows = list(csv.DictReader(file))
+        else:
+            rows = [json.loads(line) for line in file if line.strip()]
+    return {config_id(row) for row in rows}
+
+# train one config headless, run in a pool worker
+# with early_stop, episodes is the most to run and the run ends once the greedy path converged
+def run_config(config: dict) -> dict:
+    stats = maze.train_headless(config['episodes'], config['seed'], algorithm=config['algorithm'], epsilon_decay=config['epsilon_decay'], learning_rate=config['learning_rate'], discount_factor=config['discount_factor'], early_stop=config.get('early_stop', 0), tolerance=config.get('tolerance'))
+    result = dict(config)
+    for key in ['first_success', 'fastest', 'converged', 'seconds', 'steps', 'steps_per_sec']:
+        result[key] = stats[key]
+    return result
+
+# columns to write csv rows in, appending under another header would shift the columns
+# a file from before the STOP_KEYS columns still takes rows of a sweep without early stop, they read back the same
+def csv_columns(output: str, early_stop: int = 0, tolerance: float = None) -> list[str]:
+    if not output.endswith('.csv') or not os.path.exists(output) or os.path.getsize(output) == 0:
+        return RESULT_KEYS
+    with open(output, newline='') as file:
+        header = next(csv.reader(file), [])
+    if header == RESULT_KEYS or (header == [key for key in RESULT_KEYS if key not in STOP_KEYS] and early_stop == 0 and tolerance == None):
+        return header
+    raise ValueError(f'{output} has the columns {header}, expected {RESULT_KEYS}, write to a new file')
+
+# run configs over a process pool, appending results to the output file as they finish
+def run_sweep(configs: list[dict], output: str, processes: int = None, early_stop: int = 0, tolerance: float = None):
+    columns = csv_columns(output, early_stop, tolerance)
+    configs = [dict(config, early_stop=early_stop, tolerance=tolerance) for config in configs]
+    done = completed_configs(output)
+    # random search can draw the same config more than once, it runs once
+    todo = dict()
+    for config in configs:
+        if config_id(config) not in done:
+            todo.setdefault(config_id(config), config)
+    todo = list(todo.values())
+    print(f'{len(configs)} configs, {len(configs) - len(todo)} already done or repeated, {len(todo)} to run')
+    if len(todo) == 0:
+        return
+
+    is_csv = output.endswith('.csv')
+    write_header = is_csv and (not os.path.exists(output) or os.path.getsize(output) == 0)
+    with open(output, 'a', newline='') as file, multiprocessing.Pool(processes) as pool:
+        writer = csv.DictWriter(file, columns, extrasaction='ignore') if is_csv else None
+        if write_header:
+            writer.writeheader()
+        for finished, result in enumerate(pool.imap_unordered(run_config, todo), 1):
+            if is_csv:
+                writer.writerow(result)
+            else:
+                file.write(json.dumps(result) + '\n')
+            file.flush()
+            print(f'[{finished}/{len(todo)}] seed {result["seed"]} decay {result["epsilon_decay"]} lr {result["learning_rate"]} discount {result["discount_factor"]}: first success {result["first_success"]}, fastest {result["fastest"]}, converged {result["converged"]}, {result["seconds"]:.2f}s')
+        # let workers exit on their own instead of pool.terminate
+        pool.close()
+        pool.join()
+
+# endregion sweep
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Q learning hyperparameter sweep')
+    parser.add_argument('--output', default='sweep.jsonl', help='results file, .jsonl or .csv, existing results are skipped')
+    parser.add_argument('--seeds', type=int, nargs='+', default=[1], help='maze seeds')
+    parser.add_argument('--algorithms', nargs='+', choices=list(maze.MAZE_GENERATORS), default=['dfs'], help='maze generation algorithms')
+    parser.add_argument('--episodes', type=int, nargs='+', default=[100], help='episodes per run')
+    parser.add_argument('--epsilon-decay', type=float, nargs='+', default=[0.99], help='epsilon decay values')
+    parser.add_argument('--learning-rate', type=float, nargs='+', default=[0.1], help='learning rate values')
+    parser.add_argument('--discount-factor', type=float, nargs='+', default=[0.8], help='discount factor values')
+    parser.add_argument('--random', type=int, default=0, help='sample this many random configs instead of the full grid')
+    parser.add_argument('--sweep-seed', type=int, default=0, help='seed of the random search, keep it to resume')
+    parser.add_argument('--early-stop', type=int, default=0, help='end a run once its greedy path is optimal and unchanged for this many episodes')
+    parser.add_argument('--tolerance', type=float, default=None, help='with --early-stop, also require the largest Q change of those episodes to be at most this')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes, all cores by default')
+    args = parser.parse_args()
+
+    values = (args.seeds, args.algorithms, args.episodes, args.epsilon_decay, args.learning_rate, args.discount_factor)
+    configs = random_configs(args.random, args.sweep_seed, *values) if args.random > 0 else grid_configs(*values)
+    run_sweep(configs, args.output, args.processes, args.early_stop, args.tolerance)
@@ -0,0 +1,19 @@
+import os
+import sys
+
+# tests import maze from the repo root and never open a window
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pytest
+import maze
+
+# maze size and cache are module globals, every test starts from the defaults
+@pytest.fixture(autouse=True)
+def default_maze_settings():
+    maze.set_maze_size(5, 5)
+    maze.MAZE_CACHE_DIR = None
+    yield
+    maze.set_maze_size(5, 5)
+    maze.MAZE_CACHE_DIR = None
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+import maze
+
+# next action along the maze path when the grid is on it, so episodes also reach the end point
+def path_action(game_maze: maze.Maze, grid: tuple[int, int]) -> int:
+    if grid not in game_maze.path[:-1]:
+        return None
+    next_grid = game_maze.path[game_maze.path.index(grid) + 1]
+    return maze.ACTION_MOVES.index((next_grid[0] - grid[0], next_grid[1] - grid[1]))
+
+# the batch env steps each maze like a MazeEnv of its own given the same actions
+@pytest.mark.parametrize('size', [(5, 5), (4, 7)])
+def test_batch_env_matches_maze_env(size):
+    maze.set_maze_size(*size)
+    seeds = [1, 2, 3, 4]
+    batch = maze.BatchMazeEnv(seeds)
+    envs = [maze.MazeEnv(maze.Maze(seed)) for seed in seeds]
+    rng = np.random.default_rng(0)
+    finishes = 0
+    for _ in range(20 * maze.MOVE_PER_EPISODE):
+        actions = rng.integers(0, 4, len(seeds))
+        for idx, env in enumerate(envs):
+            action = path_action(env.maze, env.pos)
+            if action != None and rng.random() < 0.7:
+                actions[idx] = action
+        next_states, rewards, finished, done = batch.step(actions)
+        for idx, env in enumerate(envs):
+            next_state, reward, env_finished, env_done = env.step(int(actions[idx]))
+            assert next_states[idx] == next_state[0] * size[1] + next_state[1]
+            assert (rewards[idx], finished[idx], done[idx]) == (reward, env_finished, env_done)
+            if env_done:
+                env.reset()
+            assert batch.states[idx] == env.pos[0] * size[1] + env.pos[1]
+            assert batch.move_left[idx] == env.move_left
+            coins_left = [grid[0] * size[1] + grid[1] for bit, grid in enumerate(env.maze.coin_grids) if env.coins >> bit & 1]
+            assert np.flatnonzero(batch.coins[idx]).tolist() == sorted(coins_left)
+        finishes += int(finished.sum())
+    assert finishes > 0
@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import maze
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# training in two halves through a checkpoint ends with the same Q table as one run
+@pytest.mark.parametrize('q_table', ['dict', 'array'])
+def test_checkpoint_resume_matches_uninterrupted_run(tmp_path, q_table):
+    uninterrupted = maze.train_headless(40, seed=3, q_table=q_table)['q_learning']
+    path = str(tmp_path / 'run.ckpt')
+    maze.train_headless(20, seed=3, q_table=q_table, checkpoint=path)
+    resumed = maze.train_headless(40, checkpoint=path)['q_learning']
+    assert type(resumed) == type(uninterrupted)
+    assert resumed.current_episode == uninterrupted.current_episode
+    assert resumed.epsilon == uninterrupted.epsilon
+    assert (maze.q_table_array(resumed, '<f8') == maze.q_table_array(uninterrupted, '<f8')).all()
+
+@pytest.mark.parametrize('q_table', ['dict', 'array'])
+def test_checkpoint_round_trip(tmp_path, q_table):
+    stats = maze.train_headless(15, seed=7, q_table=q_table)
+    path = str(tmp_path / 'run.ckpt')
+    maze.save_checkpoint(path, maze.Maze(7), stats['q_learning'], stats['first_success'], stats['fastest'])
+
+    metadata, memmap_q_table = maze.open_checkpoint_q_table(path)
+    assert metadata['seed'] == 7 and metadata['q_table_backend'] == q_table
+    assert (memmap_q_table == maze.q_table_array(stats['q_learning'], metadata['q_table_dtype'])).all()
+
+    loaded_maze, q_learning, first_success, fastest = maze.load_checkpoint(path)
+    assert loaded_maze.seed == 7 and (loaded_maze.vertical_walls == maze.Maze(7).vertical_walls).all()
+    assert (first_success, fastest) == (stats['first_success'], stats['fastest'])
+    assert q_learning.current_episode == stats['q_learning'].current_episode
+    assert (maze.q_table_array(q_learning, '<f8') == maze.q_table_array(stats['q_learning'], '<f8')).all()
+
+def test_checkpoint_rejects_other_files(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'not a checkpoint')
+    with pytest.raises(ValueError):
+        maze.read_checkpoint_header(str(path))
+
+def test_rollout_needs_checkpoint():
+    result = subprocess.run([sys.executable, 'maze.py', '--rollout'], cwd=REPO_DIR, capture_output=True, text=True)
+    assert result.returncode == 2 and '--rollout needs --checkpoint' in result.stderr
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import maze
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# each export runs in its own process, it opens and quits pygame
+def export(output: str, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, os.path.join(REPO_DIR, 'maze.py'), '--export', output, '--episodes', '1', '--seed', '3', *args], capture_output=True, text=True, timeout=120)
+
+@pytest.mark.parametrize('q_table', ['dict', 'array'])
+def test_export_writes_raw_frames(tmp_path, q_table):
+    output = str(tmp_path / 'run.rgb')
+    result = export(output, '--frame-every', '5', '--q-table', q_table)
+    assert result.returncode == 0, result.stderr
+    frames = maze.MOVE_PER_EPISODE // 5
+    assert f'frames: {frames}' in result.stdout
+    assert os.path.getsize(output) == frames * maze.WIN_WIDTH * maze.WIN_HEIGHT * 3
+
+# a writer that cannot open its output stops the export instead of blocking on the full queue
+def test_export_stops_when_writer_dies(tmp_path):
+    result = export(str(tmp_path / 'missing' / 'run.y4m'))
+    assert result.returncode != 0 and 'frame writer exited' in result.stderr
+
+# an error while rendering stops the writers and lets the process exit instead of waiting on the queue
+def test_export_exits_when_rendering_fails(tmp_path):
+    script = f'''
+import maze
+update_window = maze.update_window
+calls = []
+def failing_update_window(*args):
+    calls.append(None)
+    if len(calls) > 3:
+        raise RuntimeError('boom')
+    update_window(*args)
+maze.update_window = failing_update_window
+maze.export_training({str(tmp_path / 'run.y4m')!r}, 1, seed=3)
+'''
+    result = subprocess.run([sys.executable, '-c', script], cwd=REPO_DIR, capture_output=True, text=True, timeout=60)
+    assert result.returncode != 0 and 'RuntimeError: boom' in result.stderr
@@ -0,0 +1,100 @@
+import os
+import random
+
+import numpy as np
+import pytest
+
+import maze
+
+SIZES = [(1, 1), (1, 7), (6, 1), (9, 4), (12, 12)]
+
+# grids reachable from the start point through the open walls
+def reachable_grids(vertical_walls: np.ndarray, horizontal_walls: np.ndarray) -> int:
+    rows, cols = vertical_walls.shape
+    seen = {(0, 0)}
+    stack = [(0, 0)]
+    while len(stack) > 0:
+        row, col = stack.pop()
+        neighbors = []
+        if row > 0 and not horizontal_walls[row, col]:
+            neighbors.append((row - 1, col))
+        if row < rows - 1 and not horizontal_walls[row + 1, col]:
+            neighbors.append((row + 1, col))
+        if col > 0 and not vertical_walls[row, col]:
+            neighbors.append((row, col - 1))
+        if col < cols - 1 and not vertical_walls[row, col + 1]:
+            neighbors.append((row, col + 1))
+        for grid in neighbors:
+            if grid not in seen:
+                seen.add(grid)
+                stack.append(grid)
+    return len(seen)
+
+# a perfect maze is a spanning tree of the grids: closed frame, every grid reachable, rows * cols - 1 passages
+@pytest.mark.parametrize('algorithm', list(maze.MAZE_GENERATORS))
+@pytest.mark.parametrize('size', SIZES)
+def test_generator_carves_perfect_maze(algorithm, size):
+    rows, cols = size
+    vertical_walls, horizontal_walls = maze.MAZE_GENERATORS[algorithm](rows, cols, random.Random(3))
+    assert vertical_walls.shape == horizontal_walls.shape == (rows, cols)
+    assert vertical_walls[:, 0].all() and horizontal_walls[0, :].all()
+    passages = (~vertical_walls[:, 1:]).sum() + (~horizontal_walls[1:, :]).sum()
+    assert passages == rows * cols - 1
+    assert reachable_grids(vertical_walls, horizontal_walls) == rows * cols
+
+@pytest.mark.parametrize('algorithm', list(maze.MAZE_GENERATORS))
+def test_generator_repeats_for_a_seed(algorithm):
+    first = maze.MAZE_GENERATORS[algorithm](8, 11, random.Random(42))
+    second = maze.MAZE_GENERATORS[algorithm](8, 11, random.Random(42))
+    assert (first[0] == second[0]).all() and (first[1] == second[1]).all()
+
+# the transition table agrees with the walls around every grid, a move into a wall or the frame stays put
+@pytest.mark.parametrize('algorithm', list(maze.MAZE_GENERATORS))
+@pytest.mark.parametrize('size', SIZES)
+def test_transitions_match_walls(algorithm, size):
+    maze.set_maze_size(*size)
+    rows, cols = size
+    game_maze = maze.Maze(7, algorithm)
+    assert game_maze.transitions.shape == game_maze.blocked.shape == (rows * cols, 4)
+    for row in range(rows):
+        for col in range(cols):
+            state = row * cols + col
+            valid_moves = maze.get_grid_valid_moves(game_maze, (row, col))
+            for action, move in enumerate(maze.ACTION_MOVES):
+                assert game_maze.blocked[state, action] == (move not in valid_moves)
+                next_grid = (row, col) if game_maze.blocked[state, action] else (row + move[0], col + move[1])
+                assert game_maze.transitions[state, action] == next_grid[0] * cols + next_grid[1]
+
+# the path is the BFS shortest route and every 4th grid of it holds a coin
+@pytest.mark.parametrize('algorithm', list(maze.MAZE_GENERATORS))
+def test_maze_path_and_coins(algorithm):
+    maze.set_maze_size(7, 9)
+    game_maze = maze.Maze(5, algorithm)
+    assert game_maze.path[0] == (0, 0) and game_maze.path[-1] == (6, 8)
+    for grid, next_grid in zip(game_maze.path, game_maze.path[1:]):
+        assert next_grid in [game_maze.next_grid(grid, action)[0] for action in range(4)]
+    assert game_maze.optimal_moves == len(game_maze.path) - 1
+    assert game_maze.coin_grids == game_maze.path[3::4]
+
+# a cached maze loads back the same walls, path and coins without running the generator
+@pytest.mark.parametrize('algorithm', list(maze.MAZE_GENERATORS))
+def test_maze_cache_round_trip(tmp_path, monkeypatch, algorithm):
+    maze.set_maze_size(9, 13)
+    maze.MAZE_CACHE_DIR = str(tmp_path)
+    generated = maze.Maze(11, algorithm)
+    assert sorted(os.listdir(tmp_path)) == [f'{algorithm}_9x13_11.npz']
+
+    def no_generation(rows, cols, rng):
+        raise AssertionError('maze was generated instead of loaded from the cache')
+    monkeypatch.setitem(maze.MAZE_GENERATORS, algorithm, no_generation)
+    cached = maze.Maze(11, algorithm)
+    assert cached.vertical_walls.dtype == bool and cached.vertical_walls.shape == (9, 13)
+    assert (cached.vertical_walls == generated.vertical_walls).all()
+    assert (cached.horizontal_walls == generated.horizontal_walls).all()
+    assert cached.path == generated.path and cached.coin_grids == generated.coin_grids
+    assert cached.optimal_moves == generated.optimal_moves
+
+    # another size is a different file
+    maze.set_maze_size(13, 9)
+    with pytest.raises(AssertionError):
+        maze.Maze(11, algorithm)
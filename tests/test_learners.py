@@ -0,0 +1,105 @@
+import os
+import random
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import maze
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LEARNERS = {
+    'qlearning': lambda: maze.Qlearning(500),
+    'array': lambda: maze.ArrayQlearning(500),
+    'dyna': lambda: maze.DynaQlearning(500, planning='dyna'),
+    'prioritized': lambda: maze.DynaQlearning(500, planning='prioritized'),
+    'replay': lambda: maze.ReplayQlearning(500),
+    'replay_prioritized': lambda: maze.ReplayQlearning(500, prioritized=True),
+}
+
+# every learner finds the shortest path of a small maze
+@pytest.mark.parametrize('learner', list(LEARNERS))
+@pytest.mark.parametrize('seed', [1, 3])
+def test_learner_solves_small_maze(learner, seed):
+    game_maze = maze.Maze(seed)
+    random.seed(seed)
+    solved_episode, steps, seconds = maze.train_until_solved(game_maze, LEARNERS[learner](), 500)
+    assert solved_episode != None
+
+# without planning steps prioritized sweeping is plain Q learning plus a model
+def test_prioritized_without_planning_steps_learns_like_qlearning():
+    plain = maze.train_headless(100, seed=3)
+    prioritized = maze.train_headless(100, seed=3, planning='prioritized', planning_steps=0)
+    assert prioritized['first_success'] == plain['first_success'] != None
+    assert prioritized['q_learning'].q_table == plain['q_learning'].q_table
+
+# the model keeps the mean reward without coins, not the reward of the last or worst visit
+def test_dyna_model_reward_ignores_coins():
+    q_learning = maze.DynaQlearning(10, planning_steps=0)
+    q_learning.update_q_value((0, 0), (0, 1), 3, 5, 0)
+    q_learning.update_q_value((0, 0), (0, 1), 3, -1, -1)
+    assert q_learning.model[((0, 0), 3)] == (-0.5, (0, 1), 2)
+
+def test_planning_rejects_checkpoint_and_array(tmp_path):
+    with pytest.raises(ValueError):
+        maze.train_headless(5, seed=3, planning='dyna', checkpoint=str(tmp_path / 'run.ckpt'))
+    with pytest.raises(ValueError):
+        maze.train_headless(5, seed=3, planning='dyna', q_table='array')
+
+def test_checkpoint_of_planning_run_is_not_resumed(tmp_path):
+    stats = maze.train_headless(5, seed=3, planning='dyna')
+    path = str(tmp_path / 'run.ckpt')
+    maze.save_checkpoint(path, maze.Maze(3), stats['q_learning'])
+    assert maze.read_checkpoint_header(path)[0]['learner'] == 'DynaQlearning'
+    with pytest.raises(ValueError):
+        maze.load_checkpoint(path)
+
+# prioritized draws follow the priorities, new moves get the largest priority seen so far
+def test_replay_buffer_samples_by_priority():
+    random.seed(1)
+    buffer = maze.ReplayBuffer(10, prioritized=True, alpha=1)
+    for state in range(13):
+        buffer.add(state, 0, 0, state)
+    assert buffer.size == 10 and buffer.states[:3].tolist() == [10, 11, 12]
+    buffer.update_priorities(np.array([1, 1, 2]), np.array([4.0, 4.0, 0.0]))
+    assert buffer.max_priority == pytest.approx(4.001)
+    priorities = buffer.leaves.ravel()[:10]
+    assert buffer.block_sums.sum() == pytest.approx(priorities.sum())
+    indexes, weights = buffer.sample(20000)
+    frequencies = np.bincount(indexes, minlength=10) / 20000
+    assert np.allclose(frequencies, priorities / priorities.sum(), atol=0.01)
+    assert weights.max() == 1 and weights[indexes == 1].max() < weights[indexes == 0].min()
+    buffer.add(3, 0, 0, 3)
+    assert buffer.leaves.ravel()[3] == pytest.approx(4.001)
+
+# replay stores rewards without the coin bonus and never moves a Q value past its target
+def test_replay_stores_model_reward():
+    q_learning = maze.ReplayQlearning(10, learning_rate=1, batch_size=32)
+    q_learning.epsilon = 0
+    q_learning.update_q_value((0, 0), (0, 1), 3, 5, 0)
+    assert q_learning.replay_buffer.rewards[0] == 0
+    assert q_learning.q_table[0, 0, 3] == 0
+
+def test_replay_rejects_checkpoint(tmp_path):
+    with pytest.raises(ValueError):
+        maze.train_headless(5, seed=3, replay='uniform', checkpoint=str(tmp_path / 'run.ckpt'))
+
+# coin aware states reach the end point and only allocate the states visited
+def test_sparse_learner_with_coin_state():
+    stats = maze.train_headless(300, seed=3, coin_state=True)
+    q_learning = stats['q_learning']
+    assert stats['first_success'] != None
+    assert len(q_learning.index) <= stats['steps'] + 1
+    assert max(q_learning.index) >= 25 and len(q_learning.q_values) >= len(q_learning.index)
+    # updated grids are only collected for a reader that asked for them
+    assert len(q_learning.updated_states) == 0
+    q_learning.track_updates = True
+    q_learning.update_q_value(2 * 25 + 7, 2 * 25 + 8, 3, 0)
+    assert q_learning.updated_states == {(1, 2)}
+
+@pytest.mark.parametrize('flags', [['--early-stop', '3'], ['--replay', 'uniform'], ['--planning', 'dyna']])
+def test_coin_state_flags_are_checked_by_the_parser(flags):
+    result = subprocess.run([sys.executable, 'maze.py', '--headless', '--coin-state', *flags], cwd=REPO_DIR, capture_output=True, text=True)
+    assert result.returncode == 2 and '--coin-state works without' in result.stderr
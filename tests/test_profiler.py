@@ -0,0 +1,50 @@
+import json
+import time
+
+import pytest
+
+import maze
+
+def test_lap_adds_up_phases():
+    profiler = maze.Profiler(True)
+    snapshot = profiler.snapshot()
+    for _ in range(3):
+        lap_time = profiler.lap('choose_action', time.perf_counter() - 0.002)
+        profiler.lap('update_q_value', lap_time)
+        profiler.end_step()
+    stats = profiler.stats_since(snapshot)
+    assert stats['steps'] == 3 and list(stats['phases']) == ['choose_action', 'update_q_value']
+    assert stats['phases']['choose_action']['count'] == 3
+    assert stats['phases']['choose_action']['mean_ms'] >= 2
+    assert stats['phases']['choose_action']['total_ms'] == pytest.approx(3 * stats['phases']['choose_action']['mean_ms'])
+    # a later snapshot only sees what came after it
+    assert profiler.stats_since(profiler.snapshot())['phases']['choose_action']['count'] == 0
+
+def test_jsonl_export(tmp_path):
+    path = str(tmp_path / 'stats.jsonl')
+    stats = maze.train_headless(5, seed=3, profiler=maze.Profiler(True, path, export_every=0))
+    with open(path) as file:
+        lines = [json.loads(line) for line in file]
+    assert lines[-1]['total_steps'] == stats['steps']
+    assert sum(line['steps'] for line in lines) == stats['steps']
+    assert set(lines[-1]['phases']) == {'choose_action', 'env_step', 'update_q_value'}
+
+def test_chrome_trace_export(tmp_path):
+    path = str(tmp_path / 'trace.json')
+    stats = maze.train_headless(5, seed=3, profiler=maze.Profiler(True, path))
+    # the trace array is left open, close it to read it as json
+    with open(path) as file:
+        events = json.loads(file.read().rstrip().rstrip(',') + ']')
+    assert len(events) == 3 * stats['steps']
+    assert [event['name'] for event in events[:3]] == ['choose_action', 'env_step', 'update_q_value']
+    assert all(event['ph'] == 'X' and event['dur'] >= 0 for event in events)
+
+def test_disabled_profiler_records_nothing(tmp_path):
+    profiler = maze.Profiler(False, str(tmp_path / 'stats.jsonl'))
+    assert profiler.start() == 0 and profiler.lap('choose_action', 0) == 0
+    profiler.end_step()
+    assert profiler.steps == 0 and profiler.totals == {} and not profiler.readout_due()
+    maze.train_headless(5, seed=3, profiler=profiler)
+    profiler.close()
+    assert profiler.steps == 0 and profiler.totals == {}
+    assert not (tmp_path / 'stats.jsonl').exists()
@@ -0,0 +1,41 @@
+import random
+
+import numpy as np
+import pytest
+
+import maze
+
+@pytest.fixture
+def window(monkeypatch):
+    # assets are scaled to the maze size when the window opens, so each test opens its own
+    monkeypatch.setattr(maze, 'WIN', None)
+    yield lambda: maze.init_display(offscreen=True)
+    maze.pygame.quit()
+
+# the cached maze surface and the camera at scale 1 draw the same pixels, q values are left out
+# because the camera hides them below CAMERA_MIN_Q_VALUE_FONT_SIZE
+@pytest.mark.parametrize('size', [(5, 5), (10, 5), (5, 10)])
+def test_identity_and_camera_draw_the_same(window, size):
+    maze.set_maze_size(*size)
+    window()
+    game_maze = maze.Maze(3)
+    random.seed(3)
+    q_learning = maze.Qlearning(10)
+    env = maze.MazeEnv(game_maze)
+    state = env.reset()
+    for _ in range(20):
+        action = q_learning.choose_action(state)
+        next_state, reward, finished, done = env.step(action)
+        q_learning.update_q_value(state, next_state, action, reward)
+        state = next_state
+    player = maze.Player()
+    maze.move_player(game_maze, player, 2)
+    panel = maze.Panel()
+    panel.init_panel()
+    camera = maze.Camera()
+    assert camera.is_identity()
+
+    maze.draw_window(game_maze, env.coins, player, q_learning, panel, False)
+    identity = maze.pygame.surfarray.array3d(maze.WIN)
+    maze.draw_camera_window(game_maze, env.coins, player, q_learning, panel, False, camera)
+    assert np.array_equal(identity, maze.pygame.surfarray.array3d(maze.WIN))
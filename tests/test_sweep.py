@@ -0,0 +1,54 @@
+import csv
+import json
+
+import pytest
+
+import maze
+import sweep
+
+CONFIGS = sweep.grid_configs([3], ['dfs'], [30], [0.9], [0.1, 0.5], [0.8])
+
+def read_rows(path: str) -> list[dict]:
+    with open(path) as file:
+        return [json.loads(line) for line in file]
+
+def test_sweep_resumes_and_keys_early_stop(tmp_path):
+    output = str(tmp_path / 'sweep.jsonl')
+    sweep.run_sweep(CONFIGS, output, processes=1)
+    sweep.run_sweep(CONFIGS, output, processes=1)
+    assert len(read_rows(output)) == 2
+    # the same hyperparameters with early stop are other configs
+    sweep.run_sweep(CONFIGS, output, processes=1, early_stop=3)
+    sweep.run_sweep(CONFIGS, output, processes=1, early_stop=3, tolerance=0.5)
+    rows = read_rows(output)
+    assert len(rows) == 6 and len({sweep.config_id(row) for row in rows}) == 6
+    assert [(row['early_stop'], row['tolerance']) for row in rows[4:]] == [(3, 0.5)] * 2
+
+# rows written before early_stop and tolerance were columns count as runs without early stop
+def test_old_rows_default_to_no_early_stop(tmp_path):
+    output = str(tmp_path / 'sweep.csv')
+    old_columns = [key for key in sweep.RESULT_KEYS if key not in sweep.STOP_KEYS]
+    with open(output, 'w', newline='') as file:
+        writer = csv.DictWriter(file, old_columns)
+        writer.writeheader()
+        writer.writerow(dict(CONFIGS[0], first_success=1, fastest=8, converged='', seconds=0.1, steps=10, steps_per_sec=100))
+    assert sweep.completed_configs(output) == {sweep.config_id(dict(CONFIGS[0], early_stop=0, tolerance=None))}
+    sweep.run_sweep(CONFIGS, output, processes=1)
+    with open(output, newline='') as file:
+        assert len(list(csv.DictReader(file))) == 2
+    # early stop settings have no column to go in
+    with pytest.raises(ValueError):
+        sweep.run_sweep(CONFIGS, output, processes=1, early_stop=3)
+
+def test_early_stop_reports_episodes_run():
+    stats = maze.train_headless(500, seed=3, early_stop=3)
+    assert stats['converged'] != None and stats['episodes'] == stats['converged'] < 500
+    assert maze.train_headless(20, seed=3)['episodes'] == 20
+
+# identical configs drawn by random search are trained and written once
+def test_repeated_random_configs_run_once(tmp_path):
+    output = str(tmp_path / 'sweep.jsonl')
+    configs = sweep.random_configs(5, 1, [3], ['dfs'], [30], [0.9], [0.1], [0.8])
+    assert len(configs) == 5
+    sweep.run_sweep(configs, output, processes=1)
+    assert len(read_rows(output)) == 1
@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import maze
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EPISODES = 20
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = str(tmp_path / 'run.traj')
+    maze.train_headless(EPISODES, seed=3, trajectory=path, snapshot_every=5)
+    return path
+
+def test_log_holds_every_episode(log_path):
+    log = maze.TrajectoryLog(log_path)
+    assert len(log) == EPISODES
+    assert [log.episode(idx) for idx in range(EPISODES)] == list(range(1, EPISODES + 1))
+    assert all(len(log.actions(idx)) == log.move_count(idx) > 0 for idx in range(EPISODES))
+    episode, q_table = log.snapshot(7)
+    assert episode == 6 and q_table.shape == (5, 5, 4)
+
+def test_missing_index_is_rebuilt(log_path):
+    offsets = np.fromfile(log_path + '.index', dtype='<u8')
+    os.remove(log_path + '.index')
+    log = maze.TrajectoryLog(log_path)
+    assert len(log) == EPISODES and (np.asarray(log.offsets) == offsets).all()
+
+# an interrupted run can leave the index ahead of the log, a record cut short or half an offset
+@pytest.mark.parametrize('cut', [4, 9, 10])
+def test_index_ahead_of_log(log_path, cut):
+    offsets = np.fromfile(log_path + '.index', dtype='<u8')
+    # cut into the record of the third episode from the end
+    os.truncate(log_path, int(offsets[-3]) + cut)
+    with open(log_path + '.index', 'ab') as file:
+        file.write(b'\x01\x02\x03')
+    log = maze.TrajectoryLog(log_path)
+    assert len(log) == EPISODES - 3
+    assert len(log.actions(EPISODES - 4)) == log.move_count(EPISODES - 4)
+
+# a resumed run drops the record cut short and appends after the last complete one
+def test_writer_continues_truncated_log(log_path):
+    offsets = np.fromfile(log_path + '.index', dtype='<u8')
+    os.truncate(log_path, int(offsets[-1]) + 10)
+    maze.train_headless(EPISODES + 5, seed=3, trajectory=log_path, snapshot_every=5)
+    log = maze.TrajectoryLog(log_path)
+    assert len(log) == EPISODES - 1 + EPISODES + 5
+
+# appending to a log from the command line takes the maze size from the log
+def test_cli_appends_with_the_size_of_the_log(tmp_path):
+    path = str(tmp_path / 'run.traj')
+    for size in [['--size', '4', '6'], []]:
+        result = subprocess.run([sys.executable, 'maze.py', '--headless', '--episodes', '5', '--seed', '3', '--trajectory', path, *size], cwd=REPO_DIR, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+    log = maze.TrajectoryLog(path)
+    assert (log.rows, log.cols) == (4, 6) and len(log) == 10